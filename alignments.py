@@ -1,6 +1,63 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+from collections import OrderedDict
+from itertools import combinations
+from math import gcd
+from multiprocessing import Pool, cpu_count
+
+from patterncount import rolling_pattern_numbers
+from scoringmatrices import load_matrix
+
+try:
+    import numpy as np
+except ImportError:  # numpy engine is optional
+    np = None
+
+ENGINES = ("python", "numpy", "wavefront")
+
+# Traceback direction codes
+STOP = 0
+DIAG = 1
+UP = 2
+LEFT = 3
+
+# CIGAR operation of every traceback direction: M consumes both sequences,
+# I only v and D only w
+CIGAR_OPS = {DIAG: "M", UP: "I", LEFT: "D"}
+
+# align_many modes and the Alignments method each one runs
+MODES = {
+    "global": "needleman_wunsch",
+    "local": "smith_waterman",
+    "edit": "edit_distance",
+    "affine": "affine_gap_penaly_alignment",
+    "linear_space": "myers_miller",
+    "semi_global": "semi_global_alignment",
+    "fitting": "fitting_alignment",
+    "overlap": "overlap_alignment",
+    "distance": "myers_edit_distance",
+}
+
+# States of the affine gap model
+MIDDLE = 0
+LOWER = 1
+UPPER = 2
+
+
 class Alignments:
     def __init__(
-        self, gap_penalty=-1, match_score=1, missmatch_penalty=0, sigma=-1, eps=-0.5
+        self,
+        gap_penalty=-1,
+        match_score=1,
+        missmatch_penalty=0,
+        sigma=-1,
+        eps=-0.5,
+        engine="python",
+        scoring_matrix=None,
+        cigar=False,
+        cache=None,
     ):
         self.GAP_PENALTY = gap_penalty
         self.MATCH_SCORE = match_score
@@ -8,305 +65,1868 @@ class Alignments:
         self.SIGMA = sigma
         self.EPS = eps
 
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine}")
+        if engine == "numpy" and np is None:
+            raise ImportError("numpy engine requires numpy to be installed")
+        self.engine = engine
+
+        # BLOSUM62/PAM250, a matrix file or a SubstitutionMatrix; replaces
+        # MATCH_SCORE/MISSMATCH_PENALTY
+        self.scoring_matrix = None
+        if scoring_matrix is not None:
+            self.scoring_matrix = load_matrix(scoring_matrix)
+
+        # aligners return a run-length [(op, length), ...] CIGAR in place of
+        # the two alignment strings
+        self.cigar = cigar
+
+        # AlignmentCache for needleman_wunsch and smith_waterman results
+        self.cache = cache
+
+    # Everything besides the sequences that an alignment result depends on
+    def parameters(self):
+        matrix = None
+        if self.scoring_matrix is not None:
+            matrix = (self.scoring_matrix.alphabet, self.scoring_matrix.table)
+        return (
+            self.GAP_PENALTY,
+            self.MATCH_SCORE,
+            self.MISSMATCH_PENALTY,
+            self.SIGMA,
+            self.EPS,
+            self.engine,
+            matrix,
+            self.cigar,
+        )
+
+    # Runs align(v, w) through the cache, if there is one
+    def cached(self, method, v, w, align):
+        if self.cache is None:
+            return align(v, w)
+
+        key = self.cache.key(method, self.parameters(), v, w)
+        result = self.cache.get(key)
+        if result is None:
+            result = align(v, w)
+            self.cache.put(key, result)
+        return result
+
+    # Substitution scores as a 2D table indexed by the codes of v and w, so
+    # scoring a cell is table[v_code][w_code]
+    def scoring_table(self, v, w):
+        if self.scoring_matrix is not None:
+            matrix = self.scoring_matrix
+            v, w = self.symbols(v, w)
+            return matrix.table, matrix.encode(v), matrix.encode(w)
+
+        return self.identity_table(v, w, self.MATCH_SCORE, self.MISSMATCH_PENALTY)
+
+    # Table scoring equal symbols with match and different ones with mismatch.
+    # Byte sequences are translated to codes 0..k-1 of their k symbols.
+    def identity_table(self, v, w, match, mismatch):
+        v_bytes = sequence_bytes(v)
+        w_bytes = sequence_bytes(w)
+        if v_bytes is not None and w_bytes is not None:
+            symbols = sorted(set(v_bytes).union(w_bytes))
+            translation = bytearray(256)
+            for code, symbol in enumerate(symbols):
+                translation[symbol] = code
+            table = [[match if x == y else mismatch for y in symbols] for x in symbols]
+            return table, v_bytes.translate(translation), w_bytes.translate(translation)
+
+        index = {}
+        for symbol in v:
+            index.setdefault(symbol, len(index))
+        for symbol in w:
+            index.setdefault(symbol, len(index))
+
+        table = [[match if x == y else mismatch for y in index] for x in index]
+        return table, [index[symbol] for symbol in v], [index[symbol] for symbol in w]
+
+    # v and w as bytes when both are str/bytes/bytearray/uint8 sequences, so
+    # their symbols compare as small ints, and unchanged otherwise
+    def symbols(self, v, w):
+        v_bytes = sequence_bytes(v)
+        w_bytes = sequence_bytes(w)
+        if v_bytes is None or w_bytes is None:
+            return v, w
+        return v_bytes, w_bytes
+
     def match(self, x, y):
         return int(x == y)
 
-    def backtracking(self, backtrack, v, w, i, j, s, stop_condition=None):
-        v_align = ""  #  = ["" for _ in range(num_elements)]
-        w_align = ""
-        while backtrack[i][j] != None and s[i][j] != stop_condition:
-            (i_new, j_new) = backtrack[i][j]
-            if (i_new, j_new) == (i - 1, j - 1):
-                v_align = v[i - 1] + v_align
-                w_align = w[j - 1] + w_align
-
-            elif (i_new, j_new) == (i - 1, j):
-                w_align = "-" + w_align
+    def align(self, v, w, mode="global"):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+        return getattr(self, MODES[mode])(v, w)
+
+    # Aligns every (v, w) pair, yielding results in input order. With more
+    # than one worker the pairs are sent to a process pool in chunks.
+    def align_many(self, pairs, mode="global", workers=1, chunk_size=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode: {mode}")
+
+        if workers is not None and workers <= 1:
+            for v, w in pairs:
+                yield self.align(v, w, mode)
+            return
+
+        if chunk_size is None:
+            chunk_size = 64
+            if hasattr(pairs, "__len__"):
+                chunk_size = max(1, len(pairs) // (4 * (workers or 8)))
+
+        with Pool(workers, initializer=init_worker, initargs=(self, mode)) as pool:
+            for result, counters in pool.imap(align_pair, pairs, chunk_size):
+                if counters is not None:
+                    self.cache.add_counters(counters)
+                yield result
+
+    # Yields ((i, j), result) for every pair i < j of sequences
+    def all_vs_all(self, sequences, mode="global", workers=1, chunk_size=None):
+        sequences = list(sequences)
+        indices = combinations(range(len(sequences)), 2)
+        pairs = ((sequences[i], sequences[j]) for i, j in indices)
+        results = self.align_many(pairs, mode, workers, chunk_size)
+        return zip(combinations(range(len(sequences)), 2), results)
+
+    # Allocates a flat (n x m) traceback buffer with one direction code per
+    # cell. Borders point up/left towards (0, 0) unless local alignment
+    # should stop there.
+    def traceback_matrix(self, n, m, local=False):
+        backtrack = bytearray(n * m)
+        if not local:
+            backtrack[1:m] = bytes([LEFT]) * (m - 1)
+            backtrack[m::m] = bytes([UP]) * (n - 1)
+        return backtrack
+
+    # Walks the direction codes from (i, j) back to a STOP cell, collecting
+    # runs of equal moves. Returns the CIGAR and the cell where it starts.
+    # With a band, row i of the buffer only holds columns i - band..i + band
+    def traceback_cigar(self, backtrack, m, i, j, band=None):
+        cigar = []
+        run_direction = None
+        run_length = 0
+        while True:
+            if band is None:
+                direction = backtrack[i * m + j]
             else:
-                v_align = "-" + v_align
-            i = i_new
-            j = j_new
-
-        return v_align, w_align
+                direction = backtrack[i * (2 * band + 1) + j - i + band]
+            if direction == DIAG:
+                i -= 1
+                j -= 1
+            elif direction == UP:
+                i -= 1
+            elif direction == LEFT:
+                j -= 1
+            else:
+                break
 
-    def edit_distance(self, v, w):
+            if direction == run_direction:
+                run_length += 1
+            else:
+                if run_length > 0:
+                    cigar.append((CIGAR_OPS[run_direction], run_length))
+                run_direction = direction
+                run_length = 1
+
+        if run_length > 0:
+            cigar.append((CIGAR_OPS[run_direction], run_length))
+        cigar.reverse()
+        return cigar, (i, j)
+
+    def backtracking(self, backtrack, v, w, i, j, band=None):
+        cigar, (i, j) = self.traceback_cigar(backtrack, len(w) + 1, i, j, band)
+        return self.cigar_alignment(cigar, v, w, i, j)
+
+    # Alignment strings of a CIGAR starting at v[i], w[j], in the format
+    # returned by backtracking
+    def cigar_alignment(self, cigar, v, w, i=0, j=0):
+        v_gap = gap_symbol(v)
+        w_gap = gap_symbol(w)
+        v_align = []
+        w_align = []
+        for op, length in cigar:
+            if op == "M":
+                v_align.append(v[i : i + length])
+                w_align.append(w[j : j + length])
+                i += length
+                j += length
+            elif op == "I":
+                w_align.append(w_gap * length)
+                i += length
+            else:
+                v_align.append(v_gap * length)
+                j += length
+
+        return v_gap[:0].join(v_align), w_gap[:0].join(w_align)
+
+    def moves_cigar(self, moves):
+        cigar = []
+        for move in moves:
+            append_cigar(cigar, CIGAR_OPS[move], 1)
+        return cigar
+
+    def alignment_result(self, score, cigar, v, w, i=0, j=0):
+        if self.cigar:
+            return score, cigar
+        v_align, w_align = self.cigar_alignment(cigar, v, w, i, j)
+        return score, v_align, w_align
+
+    # The DP kernel behind every linear gap aligner. free_v_start and
+    # free_w_start make skipping a prefix of v / w free (zero first column /
+    # row), free_v_end and free_w_end let the alignment end anywhere in the
+    # last column / row, and local restarts at zero and ends at the best cell.
+    # Returns (score, cigar, (i, j)) with (i, j) where the cigar starts.
+    def align_kernel(
+        self,
+        v,
+        w,
+        table,
+        v_codes,
+        w_codes,
+        gap,
+        local=False,
+        free_v_start=False,
+        free_w_start=False,
+        free_v_end=False,
+        free_w_end=False,
+    ):
         n = len(v) + 1
         m = len(w) + 1
-        s = [[0 for j in range(m)] for i in range(n)]
-        backtrack = [[None for j in range(m)] for i in range(n)]
-
-        for i in range(1, n):
-            s[i][0] = i
-            backtrack[i][0] = (i - 1, 0)
+        backtrack = self.traceback_matrix(n, m, local)
+        if free_w_start:
+            backtrack[1:m] = bytes(m - 1)
+        if free_v_start:
+            backtrack[m::m] = bytes(n - 1)
+        # only local alignment restarts, at zero
+        floor = 0 if local else float("-inf")
+
+        v_gap = 0 if free_v_start or local else gap
+        prev = [0 if free_w_start or local else j * gap for j in range(m)]
+        last_column = [prev[m - 1]]
 
-        for j in range(1, m):
-            s[0][j] = j
-            backtrack[0][j] = (0, j - 1)
+        max_score = 0
+        max_score_pos = (0, 0)
 
         for i in range(1, n):
+            scores = table[v_codes[i - 1]]
+            curr = [i * v_gap] + [0] * (m - 1)
+            row = i * m
             for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                from_up = s[i - 1][j] + 1
-                from_left = s[i][j - 1] + 1
-                from_diag = s[i - 1][j - 1] + (1 - match)
-                s[i][j] = min(from_up, from_left, from_diag)
-
-                if s[i][j] == from_diag:
-                    backtrack[i][j] = (i - 1, j - 1)
-                elif s[i][j] == from_up:
-                    backtrack[i][j] = (i - 1, j)
+                match_score = scores[w_codes[j - 1]]
+
+                from_diag = prev[j - 1] + match_score
+                from_up = prev[j] + gap
+                from_left = curr[j - 1] + gap
+                curr[j] = max(from_diag, from_up, from_left, floor)
+
+                # traceback stops at cells where the local alignment restarts
+                if curr[j] == floor:
+                    backtrack[row + j] = STOP
+                elif curr[j] == from_diag:
+                    backtrack[row + j] = DIAG
+                elif curr[j] == from_up:
+                    backtrack[row + j] = UP
                 else:
-                    backtrack[i][j] = (i, j - 1)
+                    backtrack[row + j] = LEFT
+
+            if local:
+                row_max = max(curr)
+                if row_max > max_score:
+                    max_score = row_max
+                    max_score_pos = (i, curr.index(row_max))
+            last_column.append(curr[m - 1])
+            prev = curr
+
+        if not local:
+            max_score = prev[m - 1]
+            max_score_pos = (n - 1, m - 1)
+            ends = []
+            if free_v_end:
+                ends.extend((last_column[i], (i, m - 1)) for i in range(n))
+            if free_w_end:
+                ends.extend((prev[j], (n - 1, j)) for j in range(m))
+            for score, pos in ends:
+                if score > max_score:
+                    max_score = score
+                    max_score_pos = pos
 
-        v_align, w_align = self.backtracking(backtrack, v, w, n - 1, m - 1, s)
-        return s[n - 1][m - 1], v_align, w_align
+        (i, j) = max_score_pos
+        cigar, (i, j) = self.traceback_cigar(backtrack, m, i, j)
+        return max_score, cigar, (i, j)
+
+    def linear_gap_alignment(self, v, w, **options):
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        score, cigar, (i, j) = self.align_kernel(
+            v, w, table, v_codes, w_codes, self.GAP_PENALTY, **options
+        )
+        return self.alignment_result(score, cigar, v, w, i, j)
+
+    def edit_distance(self, v, w, distance_only=False, max_distance=None):
+        if distance_only:
+            return self.myers_edit_distance(v, w, max_distance)
+        if self.engine == "wavefront":
+            return self.edit_distance_wavefront(v, w)
+
+        # unit costs are scores 0 / -1 / -1 to maximize
+        table, v_codes, w_codes = self.identity_table(v, w, 0, -1)
+        score, cigar, (i, j) = self.align_kernel(v, w, table, v_codes, w_codes, -1)
+        return self.alignment_result(-score, cigar, v, w, i, j)
+
+    # Edit distance if it is at most k, None otherwise (Ukkonen's cutoff).
+    # Only the diagonals |i - j| <= k are filled, and the fill stops at the
+    # first row where every cell is already above k.
+    def edit_distance_within(self, v, w, k):
+        v, w = self.symbols(v, w)
+        n = len(v)
+        m = len(w)
+        if abs(n - m) > k:
+            return None
+
+        width = 2 * k + 1
+        above = k + 1  # every cell outside the band
+        prev = [above] * width
+        for j in range(min(m, k) + 1):
+            prev[j + k] = j
+
+        for i in range(1, n + 1):
+            curr = [above] * width
+            row_min = above
+            if i <= k:
+                curr[k - i] = row_min = i
+
+            symbol = v[i - 1]
+            for j in range(max(1, i - k), min(m, i + k) + 1):
+                d = j - i + k
+                distance = prev[d] + (symbol != w[j - 1])
+                if d + 1 < width and prev[d + 1] + 1 < distance:
+                    distance = prev[d + 1] + 1
+                if d > 0 and curr[d - 1] + 1 < distance:
+                    distance = curr[d - 1] + 1
+                curr[d] = distance
+                if distance < row_min:
+                    row_min = distance
+
+            if row_min > k:
+                return None
+            prev = curr
+
+        distance = prev[m - n + k]
+        return distance if distance <= k else None
+
+    # Myers' bit-vector algorithm: column j of the DP matrix is kept as
+    # vertical deltas packed in two ints (Pv: +1, Mv: -1), one bit per
+    # symbol of v. Returns None once the distance exceeds max_distance.
+    def myers_edit_distance(self, v, w, max_distance=None):
+        v, w = self.symbols(v, w)
+        m = len(v)
+        n = len(w)
+        if max_distance is not None and abs(m - n) > max_distance:
+            return None
+        if m == 0:
+            return n
+
+        peq = {}
+        for i, symbol in enumerate(v):
+            peq[symbol] = peq.get(symbol, 0) | (1 << i)
+
+        mask = (1 << m) - 1
+        high_bit = 1 << (m - 1)
+        pv = mask
+        mv = 0
+        score = m
+
+        for j, symbol in enumerate(w):
+            eq = peq.get(symbol, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | (~(xh | pv) & mask)
+            mh = pv & xh
+
+            if ph & high_bit:
+                score += 1
+            elif mh & high_bit:
+                score -= 1
+
+            # D[0][j] = j, so every column starts with a +1 horizontal delta
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = mh | (~(xv | ph) & mask)
+            mv = ph & xv
+
+            # each remaining column can lower the score by at most one
+            if max_distance is not None and score - (n - j - 1) > max_distance:
+                return None
+
+        if max_distance is not None and score > max_distance:
+            return None
+        return score
 
     # Longest commont subsequence
     def lcs_backtrack(self, v, w):
-        n = len(v) + 1
-        m = len(w) + 1
-        s = [[0 for j in range(m)] for i in range(n)]
-        backtrack = [[None for j in range(m)] for i in range(n)]
-
-        for i in range(1, n):
-            backtrack[i][0] = (i - 1, 0)
+        # mismatches can never be on the diagonal
+        table, v_codes, w_codes = self.identity_table(v, w, 1, float("-inf"))
+        _, cigar, (i, j) = self.align_kernel(v, w, table, v_codes, w_codes, 0)
+
+        lcs = []
+        for op, length in cigar:
+            if op == "M":
+                lcs.append(v[i : i + length])
+            if op != "D":
+                i += length
+        return gap_symbol(v)[:0].join(lcs)
+
+    # Bit-parallel LCS (Allison-Dix, Hyyro): one int holds a DP column over
+    # v, a cleared bit i meaning the LCS grows at row i. Returns
+    # LCS(v, w[:j]) for every j; the LCS grows when the addition carries out
+    # of the top bit.
+    def lcs_lengths(self, v, w):
+        v, w = self.symbols(v, w)
+        peq = {}
+        for i, symbol in enumerate(v):
+            peq[symbol] = peq.get(symbol, 0) | (1 << i)
 
-        for j in range(1, m):
-            backtrack[0][j] = (0, j - 1)
-
-        for i in range(1, n):
-            for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                from_up = s[i - 1][j]
-                from_left = s[i][j - 1]
-                from_diag = s[i - 1][j - 1] + match
-                s[i][j] = max(from_up, from_left, from_diag)
-
-                if match == 1 and s[i][j] == from_diag:
-                    backtrack[i][j] = (i - 1, j - 1)
-                elif s[i][j] == from_up:
-                    backtrack[i][j] = (i - 1, j)
-                else:
-                    backtrack[i][j] = (i, j - 1)
-
-        lcs = ["" for _ in range(s[n - 1][m - 1])]
-        i = n - 1
-        j = m - 1
-        k = s[n - 1][m - 1] - 1
-        while backtrack[i][j] != None:
-            (i_new, j_new) = backtrack[i][j]
-            if (i_new, j_new) == (i - 1, j - 1):
-                lcs[k] = v[i - 1]
-                k -= 1
-            i = i_new
-            j = j_new
-
-        return "".join(lcs)
+        n = len(v)
+        mask = (1 << n) - 1
+        column = mask
+        length = 0
+        lengths = [0]
+        for symbol in w:
+            matches = column & peq.get(symbol, 0)
+            total = column + matches
+            length += total >> n
+            column = (total | (column - matches)) & mask
+            lengths.append(length)
+        return lengths
+
+    def lcs_length(self, v, w):
+        # fewer, wider steps: loop over the shorter sequence
+        if len(v) < len(w):
+            v, w = w, v
+        return self.lcs_lengths(v, w)[-1]
+
+    # Hirschberg-style LCS in linear space: v is halved and w is split where
+    # the LCS lengths of the top half and of the reversed bottom half add up
+    # to the most. Works on strings, bytes and lists of tokens.
+    def lcs_linear_space(self, v, w):
+        original = v
+        v, w = self.symbols(v, w)
+        lcs = []
+
+        def split(v, w):
+            if not v or not w:
+                return
+            if len(v) == 1:
+                if v[0] in w:
+                    lcs.append(v[0])
+                return
+
+            mid = len(v) // 2
+            upper = self.lcs_lengths(v[:mid], w)
+            lower = self.lcs_lengths(v[mid:][::-1], w[::-1])
+            m = len(w)
+            k = max(range(m + 1), key=lambda j: upper[j] + lower[m - j])
+            split(v[:mid], w[:k])
+            split(v[mid:], w[k:])
+
+        split(v, w)
+        if isinstance(v, (bytes, bytearray)):
+            lcs = bytes(lcs)
+            if isinstance(original, str):
+                return lcs.decode("latin-1")
+            return lcs
+        if isinstance(original, str):
+            return "".join(lcs)
+        return lcs
 
     # Globalno poravnanje
     def needleman_wunsch(self, v, w):
-        n = len(v) + 1
-        m = len(w) + 1
+        return self.cached("needleman_wunsch", v, w, self.global_alignment)
+
+    def global_alignment(self, v, w):
+        if self.engine == "numpy" and self.score_scale() is not None:
+            return self.needleman_wunsch_numpy(v, w)
+        if self.engine == "wavefront":
+            return self.needleman_wunsch_wavefront(v, w)
+        return self.linear_gap_alignment(v, w)
+
+    # Poluglobalno poravnanje: gaps at either end of v and w are free
+    def semi_global_alignment(self, v, w):
+        return self.linear_gap_alignment(
+            v, w, free_v_start=True, free_w_start=True, free_v_end=True, free_w_end=True
+        )
 
-        s = [[0 for _ in range(m)] for _ in range(n)]
-        backtrack = [[None for _ in range(m)] for _ in range(n)]
+    # Fitting alignment of all of w against a substring of v
+    def fitting_alignment(self, v, w):
+        return self.linear_gap_alignment(v, w, free_v_start=True, free_v_end=True)
 
-        for i in range(1, n):
-            s[i][0] = i * self.GAP_PENALTY
-            backtrack[i][0] = (i - 1, 0)
+    # Overlap alignment of a suffix of v against a prefix of w
+    def overlap_alignment(self, v, w):
+        return self.linear_gap_alignment(v, w, free_v_start=True, free_w_end=True)
 
-        for j in range(1, m):
-            s[0][j] = j * self.GAP_PENALTY
-            backtrack[0][j] = (0, j - 1)
+    # Globalno poravnanje u traci: only cells with |i - j| <= band are filled,
+    # row by row with numpy when the scores scale to integers. Time is
+    # O(len(v) * band) and the traceback takes len(v) * (2 * band + 1) bytes.
+    def needleman_wunsch_banded(self, v, w, band):
+        if np is not None and self.score_scale() is not None:
+            return self.needleman_wunsch_banded_numpy(v, w, band)
+
+        n = len(v) + 1
+        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        band = max(band, abs(n - m))  # (n - 1, m - 1) has to be inside
+        width = 2 * band + 1
+        minus_inf = float("-inf")
+
+        backtrack = bytearray(n * width)
+        prev = [minus_inf] * width
+        for j in range(min(m, band + 1)):
+            prev[j + band] = j * self.GAP_PENALTY
+            if j > 0:
+                backtrack[j + band] = LEFT
 
         for i in range(1, n):
-            for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                match_score = 0
-                if match == 1:
-                    match_score = self.MATCH_SCORE
+            scores = table[v_codes[i - 1]]
+            curr = [minus_inf] * width
+            row = i * width
+            for j in range(max(0, i - band), min(m - 1, i + band) + 1):
+                k = j - i + band
+                if j == 0:
+                    curr[k] = i * self.GAP_PENALTY
+                    backtrack[row + k] = UP
+                    continue
+
+                match_score = scores[w_codes[j - 1]]
+
+                from_diag = prev[k] + match_score
+                from_up = minus_inf
+                if k + 1 < width:
+                    from_up = prev[k + 1] + self.GAP_PENALTY
+                from_left = minus_inf
+                if k > 0:
+                    from_left = curr[k - 1] + self.GAP_PENALTY
+                curr[k] = max(from_diag, from_up, from_left)
+
+                if curr[k] == from_diag:
+                    backtrack[row + k] = DIAG
+                elif curr[k] == from_up:
+                    backtrack[row + k] = UP
                 else:
-                    match_score = self.MISSMATCH_PENALTY
+                    backtrack[row + k] = LEFT
+            prev = curr
 
-                from_diag = s[i - 1][j - 1] + match_score
-                from_up = s[i - 1][j] + self.GAP_PENALTY
-                from_left = s[i][j - 1] + self.GAP_PENALTY
-                s[i][j] = max(from_diag, from_up, from_left)
+        cigar, (i, j) = self.traceback_cigar(backtrack, m, n - 1, m - 1, band)
+        return self.alignment_result(prev[m - n + band], cigar, v, w, i, j)
 
-                if s[i][j] == from_diag:
-                    backtrack[i][j] = (i - 1, j - 1)
-                elif s[i][j] == from_up:
-                    backtrack[i][j] = (i - 1, j)
-                else:
-                    backtrack[i][j] = (i, j - 1)
+    # needleman_wunsch_banded with every band row filled at once, like
+    # fill_numpy in exact int64. Row i holds cell (i, j) at k = j - i + band,
+    # so the diagonal predecessor is prev[k] and the vertical one prev[k + 1].
+    def needleman_wunsch_banded_numpy(self, v, w, band):
+        n = len(v) + 1
+        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        scale = self.score_scale()
+        table = np.array(table, dtype=np.float64).reshape(len(table), len(table))
+        table = (table * scale).astype(np.int64)
+        w_codes = np.fromiter(w_codes, dtype=np.int64, count=len(w_codes))
+        gap = int(self.GAP_PENALTY * scale)
+        band = max(band, abs(n - m))
+        width = 2 * band + 1
+        minus_inf = np.iinfo(np.int64).min // 4
+
+        offsets = np.arange(width, dtype=np.int64) * gap
+        # one extra cell past the band, so prev[k + 1] always exists
+        prev = np.full(width + 1, minus_inf, dtype=np.int64)
+        curr = np.empty_like(prev)
+        first = min(m, band + 1)
+        prev[band : band + first] = offsets[:first]
+
+        backtrack = bytearray(n * width)
+        directions = np.frombuffer(backtrack, dtype=np.uint8).reshape(n, width)
+        directions[0, band + 1 : band + first] = LEFT
+
+        for i in range(1, n):
+            j_lo = max(0, i - band)
+            j_hi = min(m - 1, i + band)
+            k_lo = j_lo - i + band
+            k_hi = j_hi - i + band
+            j_first = max(1, j_lo)  # first cell with a diagonal predecessor
+            k_first = j_first - i + band
+
+            curr.fill(minus_inf)
+            from_diag = (
+                prev[k_first : k_hi + 1]
+                + table[v_codes[i - 1]][w_codes[j_first - 1 : j_hi]]
+            )
+            from_up = prev[k_first + 1 : k_hi + 2] + gap
+            np.maximum(from_diag, from_up, out=curr[k_first : k_hi + 1])
+            if j_lo == 0:
+                curr[k_lo] = i * gap
+
+            segment = curr[k_lo : k_hi + 1]
+            self.left_gaps(segment, offsets[: len(segment)])
+
+            cells = curr[k_first : k_hi + 1]
+            direction = directions[i, k_first : k_hi + 1]
+            direction[:] = LEFT
+            direction[cells == from_up] = UP
+            direction[cells == from_diag] = DIAG
+            if j_lo == 0:
+                directions[i, k_lo] = UP
+
+            prev, curr = curr, prev
+
+        score = prev[m - n + band].item()
+        if self.score_dtype() is np.float64:
+            score = score / scale
+        cigar, (i, j) = self.traceback_cigar(backtrack, m, n - 1, m - 1, band)
+        return self.alignment_result(score, cigar, v, w, i, j)
+
+    # Upper bound on the score of any global alignment of lengths n and m
+    # that leaves the band: it needs at least 2 * (band + 1) - |n - m| gaps,
+    # and every other column scores at most best_match.
+    def band_escape_bound(self, n, m, band, best_match):
+        def bound(gaps):
+            return best_match * (n + m - gaps) / 2 + self.GAP_PENALTY * gaps
+
+        return max(bound(2 * (band + 1) - abs(n - m)), bound(n + m))
+
+    # Doubles the band until no alignment leaving it can beat the banded
+    # score, so the result is the same as needleman_wunsch. The banded score
+    # is a lower bound on the optimum, so once the band whose escape bound
+    # falls below it is at most 4 times the current one, that band is the
+    # last. The band needed grows with the cost of the edits between v and
+    # w, and the traceback takes len(v) * (2 * band + 1) bytes.
+    def needleman_wunsch_adaptive(self, v, w, band=8):
+        n = len(v)
+        m = len(w)
+        band = max(band, abs(n - m), 1)
+        table, _, _ = self.scoring_table(v, w)
+        best_match = max(map(max, table), default=self.MATCH_SCORE)
+        slope = best_match / 2 - self.GAP_PENALTY
+        while True:
+            result = self.needleman_wunsch_banded(v, w, band)
+            bound = self.band_escape_bound(n, m, band, best_match)
+            if self.score_scale() is None:
+                # rounded scores could beat an exact tie outside the band
+                bound += 1e-9 * (abs(bound) + 1)
+            if band >= max(n, m) or result[0] > bound:
+                return result
+
+            needed = 2 * band
+            if slope > 0:
+                gaps = (best_match * (n + m) / 2 - result[0]) / slope
+                proven = int((gaps + abs(n - m)) / 2) + 1
+                if proven <= 4 * band:
+                    needed = max(needed, proven)
+            band = min(needed, max(n, m))
+
+    # Wavefront alignment (WFA) with penalties: 0 for a match, mismatch and
+    # gap > 0. Wavefront s holds, for every diagonal k = j - i, the furthest
+    # column j reached with penalty s, so the work grows with the penalty of
+    # the alignment instead of len(v) * len(w). Returns (penalty, cigar).
+    def wavefront_alignment(self, v, w, mismatch, gap):
+        v, w = self.symbols(v, w)
+        n = len(v)
+        m = len(w)
+        final_k = m - n
+
+        def extend(k, j):
+            i = j - k
+            while i < n and j < m and v[i] == w[j]:
+                i += 1
+                j += 1
+            return j
+
+        # s -> (lowest diagonal, furthest columns); -1 marks unreachable
+        wavefronts = {0: (0, [extend(0, 0)])}
+
+        def reached(s, k):
+            if s not in wavefronts:
+                return -1
+            lo, offsets = wavefronts[s]
+            if lo <= k < lo + len(offsets):
+                return offsets[k - lo]
+            return -1
+
+        # furthest column on diagonal k before extension and the move that
+        # reaches it
+        def best_move(s, k):
+            best = -1
+            move = STOP
+            j = reached(s - mismatch, k)
+            if j >= 0 and j < m and j - k < n:
+                best = j + 1
+                move = DIAG
+            j = reached(s - gap, k + 1)
+            if j >= 0 and j - k - 1 < n and j > best:
+                best = j
+                move = UP
+            j = reached(s - gap, k - 1)
+            if j >= 0 and j < m and j + 1 > best:
+                best = j + 1
+                move = LEFT
+            return best, move
+
+        s = 0
+        while reached(s, final_k) < m:
+            s += 1
+            sources = [
+                wavefronts[t] for t in (s - mismatch, s - gap) if t in wavefronts
+            ]
+            if not sources:
+                continue
+            lo = max(-n, min(source[0] for source in sources) - 1)
+            hi = min(m, max(source[0] + len(source[1]) for source in sources))
+            offsets = []
+            for k in range(lo, hi + 1):
+                best, move = best_move(s, k)
+                offsets.append(extend(k, best) if best >= 0 else -1)
+            wavefronts[s] = (lo, offsets)
+
+        penalty = s
+        cigar = []
+        k = final_k
+        j = m
+        while s > 0:
+            best, move = best_move(s, k)
+            append_cigar(cigar, "M", j - best)
+            if move == DIAG:
+                append_cigar(cigar, "M", 1)
+                s -= mismatch
+                j = best - 1
+            elif move == UP:
+                append_cigar(cigar, "I", 1)
+                s -= gap
+                k += 1
+                j = best
+            else:
+                append_cigar(cigar, "D", 1)
+                s -= gap
+                k -= 1
+                j = best - 1
+        append_cigar(cigar, "M", j)
+        cigar.reverse()
+        return penalty, cigar
+
+    # needleman_wunsch on the wavefront engine. A global alignment has
+    # 2 * matches + 2 * mismatches + gaps = len(v) + len(w), so its score is
+    # (MATCH_SCORE * (len(v) + len(w)) - penalty) / 2 with the penalties
+    # below, which have to be positive integers.
+    def needleman_wunsch_wavefront(self, v, w):
+        mismatch = 2 * (self.MATCH_SCORE - self.MISSMATCH_PENALTY)
+        gap = self.MATCH_SCORE - 2 * self.GAP_PENALTY
+        if self.scoring_matrix is not None:
+            raise ValueError("wavefront engine does not support scoring matrices")
+        if mismatch <= 0 or gap <= 0 or mismatch % 1 or gap % 1:
+            raise ValueError(
+                "wavefront engine needs match_score > missmatch_penalty and "
+                "match_score > 2 * gap_penalty with integer differences"
+            )
+
+        unit = gcd(int(mismatch), int(gap))
+        penalty, cigar = self.wavefront_alignment(
+            v, w, int(mismatch) // unit, int(gap) // unit
+        )
+        score = (self.MATCH_SCORE * (len(v) + len(w)) - penalty * unit) // 2
+        return self.alignment_result(score, cigar, v, w)
 
-        v_align, w_align = self.backtracking(backtrack, v, w, n - 1, m - 1, s)
-        return s[n - 1][m - 1], v_align, w_align
+    def edit_distance_wavefront(self, v, w):
+        distance, cigar = self.wavefront_alignment(v, w, 1, 1)
+        return self.alignment_result(distance, cigar, v, w)
 
     # Lokalno poravnanje
     def smith_waterman(self, v, w):
+        return self.cached("smith_waterman", v, w, self.local_alignment)
+
+    def local_alignment(self, v, w):
+        if self.engine == "numpy" and self.score_scale() is not None:
+            return self.smith_waterman_numpy(v, w)
+        return self.linear_gap_alignment(v, w, local=True)
+
+    # Waterman-Eggert: the k best local alignments that share no aligned
+    # pair (i, j). After every traceback its pairs are masked and only the
+    # cells whose score or direction can change are filled again.
+    def top_k_local(self, v, w, k):
         n = len(v) + 1
         m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        gap = self.GAP_PENALTY
+        scores = [0] * (n * m)
+        backtrack = self.traceback_matrix(n, m, local=True)
+        masked = bytearray(n * m)
+
+        def fill(i, j):
+            cell = i * m + j
+            score = 0
+            direction = STOP
+            if not masked[cell]:
+                from_diag = scores[cell - m - 1] + table[v_codes[i - 1]][w_codes[j - 1]]
+                from_up = scores[cell - m] + gap
+                from_left = scores[cell - 1] + gap
+                score = max(from_diag, from_up, from_left, 0)
+
+                if score == 0:
+                    direction = STOP
+                elif score == from_diag:
+                    direction = DIAG
+                elif score == from_up:
+                    direction = UP
+                else:
+                    direction = LEFT
 
-        s = [[0 for _ in range(m)] for _ in range(n)]
-        backtrack = [[None for _ in range(m)] for _ in range(n)]
-
-        for i in range(1, n):
-            backtrack[i][0] = (i - 1, 0)
-        for j in range(1, m):
-            backtrack[0][j] = (0, j - 1)
+            changed = score != scores[cell] or direction != backtrack[cell]
+            scores[cell] = score
+            backtrack[cell] = direction
+            return changed
 
-        max_score = 0
-        max_score_pos = (0, 0)
+        # (score, j) of the first best cell of every row
+        def row_max(i):
+            row = scores[i * m : (i + 1) * m]
+            best = max(row)
+            return best, row.index(best)
 
         for i in range(1, n):
             for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                match_score = 0
+                fill(i, j)
+        row_maxima = [row_max(i) for i in range(n)]
+
+        alignments = []
+        while len(alignments) < k:
+            max_score = 0
+            max_score_pos = (0, 0)
+            for i in range(1, n):
+                if row_maxima[i][0] > max_score:
+                    max_score = row_maxima[i][0]
+                    max_score_pos = (i, row_maxima[i][1])
+            if max_score <= 0:
+                break
+
+            i, j = max_score_pos
+            cigar, (i, j) = self.traceback_cigar(backtrack, m, i, j)
+            alignments.append(self.alignment_result(max_score, cigar, v, w, i, j))
+
+            # mask the aligned pairs of the alignment
+            mask_columns = {}
+            first_row = i + 1
+            for op, length in cigar:
+                for _ in range(length):
+                    if op != "D":
+                        i += 1
+                    if op != "I":
+                        j += 1
+                    if op == "M":
+                        masked[i * m + j] = 1
+                        mask_columns.setdefault(i, set()).add(j)
+            last_row = i
+
+            # refill the cells downstream of the masked ones until a row
+            # stops changing
+            prev_changed = set()
+            for i in range(first_row, n):
+                columns = mask_columns.get(i, set())
+                if not prev_changed and not columns:
+                    if i > last_row:
+                        break
+                    continue
+
+                candidates = columns | prev_changed
+                lo = min(candidates)
+                hi = max(candidates) + 1
+                changed = set()
+                for j in range(lo, m):
+                    if j > hi and j - 1 not in changed:
+                        break
+                    if (
+                        j in columns
+                        or j in prev_changed
+                        or j - 1 in prev_changed
+                        or j - 1 in changed
+                    ):
+                        if fill(i, j):
+                            changed.add(j)
+
+                if changed:
+                    row_maxima[i] = row_max(i)
+                prev_changed = changed
+
+        return alignments
+
+    def encode(self, v):
+        codes = sequence_bytes(v)
+        if codes is None:
+            return np.fromiter(map(ord, v), dtype=np.int64, count=len(v))
+        return np.frombuffer(codes, dtype=np.uint8).astype(np.int64)
+
+    def score_dtype(self):
+        scores = (self.GAP_PENALTY, self.MATCH_SCORE, self.MISSMATCH_PENALTY)
+        if all(isinstance(score, int) for score in scores):
+            return np.int64
+        return np.float64
+
+    # Smallest power of two that makes the gap, match and mismatch scores
+    # integers, or None. Sums of such scores are exact in floating point, so
+    # integer DP scaled back gives the same floats as the Python engine;
+    # other scores (e.g. -0.1) would round differently in the prefix
+    # maximum of fill_numpy and are aligned by the Python engine instead.
+    def score_scale(self):
+        scores = (self.GAP_PENALTY, self.MATCH_SCORE, self.MISSMATCH_PENALTY)
+        for power in range(33):
+            scale = 2**power
+            if all(float(score * scale).is_integer() for score in scores):
+                return scale
+        return None
+
+    # Fills the DP matrix row by row over integer-encoded sequences, with
+    # the scores multiplied by score_scale so they are exact int64.
+    # Diagonal and vertical moves of a row are computed at once, and the
+    # horizontal gap term H[i][j - 1] + g is resolved with a prefix maximum:
+    # H[i][j] = max_k<=j (t[k] - k * g) + j * g
+    def fill_numpy(self, v, w, local=False):
+        n = len(v) + 1
+        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        scale = self.score_scale()
+        dtype = np.int64
+        table = np.array(table, dtype=np.float64).reshape(len(table), len(table))
+        table = (table * scale).astype(dtype)
+        w_codes = np.fromiter(w_codes, dtype=np.int64, count=len(w_codes))
+        gap = int(self.GAP_PENALTY * scale)
 
-                if match == 1:
-                    match_score = self.MATCH_SCORE
-                else:
-                    match_score = self.MISSMATCH_PENALTY
+        offsets = np.arange(m, dtype=dtype) * gap
+        prev = np.zeros(m, dtype=dtype) if local else offsets.copy()
+        row = np.empty(m, dtype=dtype)
 
-                from_up = s[i - 1][j] + self.GAP_PENALTY
-                from_left = s[i][j - 1] + self.GAP_PENALTY
-                from_diag = s[i - 1][j - 1] + match_score
+        backtrack = self.traceback_matrix(n, m, local)
+        directions = np.frombuffer(backtrack, dtype=np.uint8).reshape(n, m)
 
-                s[i][j] = max(from_diag, from_up, from_left, 0)
+        max_score = 0
+        max_score_pos = (0, 0)
 
-                if s[i][j] > max_score:
-                    max_score = s[i][j]
+        for i in range(1, n):
+            match_scores = table[v_codes[i - 1]][w_codes]
+            from_diag = prev[:-1] + match_scores
+            from_up = prev[1:] + gap
+
+            row[0] = 0 if local else i * gap
+            np.maximum(from_diag, from_up, out=row[1:])
+            if local:
+                np.maximum(row[1:], 0, out=row[1:])
+
+            self.left_gaps(row, offsets)
+
+            cells = row[1:]
+            direction = directions[i, 1:]
+            direction[:] = LEFT
+            direction[cells == from_up] = UP
+            direction[cells == from_diag] = DIAG
+
+            if local:
+                direction[cells == 0] = STOP
+                j = int(np.argmax(row))
+                if row[j] > max_score:
+                    max_score = row[j].item()
                     max_score_pos = (i, j)
 
-                if s[i][j] == from_diag:
-                    backtrack[i][j] = (i - 1, j - 1)
-                elif s[i][j] == from_up:
-                    backtrack[i][j] = (i - 1, j)
-                else:
-                    backtrack[i][j] = (i, j - 1)
-
-        (i, j) = max_score_pos
-        v_align, w_align = self.backtracking(backtrack, v, w, i, j, s, 0)
+            prev, row = row, prev
+
+        if not local:
+            max_score = prev[m - 1].item()
+            max_score_pos = (n - 1, m - 1)
+
+        if self.score_dtype() is np.float64:
+            max_score = max_score / scale
+        return backtrack, max_score, max_score_pos
+
+    # Resolves the horizontal gaps of a row in place with a prefix maximum,
+    # offsets being arange(len(row)) * gap
+    def left_gaps(self, row, offsets):
+        row -= offsets
+        np.maximum.accumulate(row, out=row)
+        row += offsets
+
+    def needleman_wunsch_numpy(self, v, w):
+        backtrack, score, (i, j) = self.fill_numpy(v, w)
+        cigar, (i, j) = self.traceback_cigar(backtrack, len(w) + 1, i, j)
+        return self.alignment_result(score, cigar, v, w, i, j)
+
+    def smith_waterman_numpy(self, v, w):
+        backtrack, max_score, (i, j) = self.fill_numpy(v, w, local=True)
+        cigar, (i, j) = self.traceback_cigar(backtrack, len(w) + 1, i, j)
+        return self.alignment_result(max_score, cigar, v, w, i, j)
+
+    # Score-only Smith-Waterman (Farrar's striped layout) of the profiled
+    # query v against w. One column of the matrix is a (segments x lanes)
+    # array, query position i sits at [i % segments, i // segments].
+    def smith_waterman_striped(self, v, w, profile=None):
+        if np is None:
+            raise ImportError("striped engine requires numpy to be installed")
+        if profile is None:
+            profile = QueryProfile(v, self)
+        if len(v) == 0:
+            return 0
+
+        gap = self.GAP_PENALTY
+        offsets = profile.offsets
+        h = np.zeros(profile.shape, dtype=profile.dtype)
+        diag = np.empty_like(h)
+        max_score = 0
 
-        return (max_score, v_align, w_align)
+        for residue in w:
+            # H[i - 1] of the previous column, wrapping into the previous lane
+            diag[1:] = h[:-1]
+            diag[0, 1:] = h[-1, :-1]
+            diag[0, 0] = 0
+            diag += profile.scores(residue)
+
+            h += gap
+            np.maximum(h, diag, out=h)
+            np.maximum(h, 0, out=h)
+
+            # vertical gaps inside every lane at once
+            h -= offsets
+            np.maximum.accumulate(h, axis=0, out=h)
+            h += offsets
+
+            # lazy F: push vertical gaps over lane boundaries while they help
+            carry = h[-1, :-1] + gap
+            while np.any(carry > h[0, 1:]):
+                np.maximum(h[:, 1:], carry + offsets, out=h[:, 1:])
+                carry = h[-1, :-1] + gap
+
+            column_max = h.max().item()
+            if column_max > max_score:
+                max_score = column_max
+
+        return max_score
+
+    # Scores every target against the query with the striped engine and
+    # runs the full smith_waterman only for targets scoring >= threshold
+    def smith_waterman_search(self, query, targets, threshold, lanes=16):
+        profile = QueryProfile(query, self, lanes)
+        for index, target in enumerate(targets):
+            score = self.smith_waterman_striped(query, target, profile)
+            if score >= threshold:
+                yield index, self.smith_waterman(query, target)
 
     def needleman_wunsch_last_line(self, v, w):
-        n = len(v) + 1
-        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        return self.last_line((table, v_codes, w_codes), (0, len(v), 0, len(w)))
+
+    # needleman_wunsch_last_line of v[v_lo:v_hi] against w[w_lo:w_hi], or of
+    # both reversed, read from the codes of scoring_table without slicing v
+    def last_line(self, encoded, block, reverse=False):
+        table, v_codes, w_codes = encoded
+        v_lo, v_hi, w_lo, w_hi = block
+        m = w_hi - w_lo + 1
+        columns = w_codes[w_lo:w_hi]
+        rows = range(v_lo, v_hi)
+        if reverse:
+            columns = columns[::-1]
+            rows = reversed(rows)
 
-        s = [[0 for _ in range(m)] for _ in range(2)]
         # inicijalizacija
-        for j in range(m):
-            s[0][j] = j * self.GAP_PENALTY
+        prev = [j * self.GAP_PENALTY for j in range(m)]
+        for i, row in enumerate(rows, 1):
+            scores = table[v_codes[row]]
+            curr = [i * self.GAP_PENALTY] + [0] * (m - 1)
+            for j in range(1, m):
+                match_score = scores[columns[j - 1]]
+
+                from_up = prev[j] + self.GAP_PENALTY
+                from_left = curr[j - 1] + self.GAP_PENALTY
+                from_diag = prev[j - 1] + match_score
+
+                curr[j] = max(from_diag, from_up, from_left)
+            prev = curr
+        return prev
+
+    # With more than one worker the forward and reverse last lines of the
+    # top levels of recursion are computed on a process pool, and so are the
+    # blocks they split the alignment into
+    def hirschberg(self, v, w, workers=1):
+        encoded = self.scoring_table(v, w)
+        block = (0, len(v), 0, len(w))
+        pieces = []
+
+        if workers is not None and workers <= 1:
+            self.hirschberg_pieces(v, w, encoded, block, pieces)
+        else:
+            levels = max(1, ((workers or cpu_count()) - 1).bit_length())
+            initargs = (self, v, w, encoded)
+            with Pool(
+                workers, initializer=init_hirschberg_worker, initargs=initargs
+            ) as pool:
+                blocks = [block]
+                for _ in range(levels):
+                    tasks = [
+                        (block, reverse)
+                        for block in blocks
+                        if not self.hirschberg_leaf(block)
+                        for reverse in (False, True)
+                    ]
+                    lines = iter(pool.map(hirschberg_line, tasks))
+                    next_blocks = []
+                    for block in blocks:
+                        if self.hirschberg_leaf(block):
+                            next_blocks.append(block)
+                        else:
+                            score_l = next(lines)
+                            score_r = next(lines)[::-1]
+                            next_blocks.extend(
+                                self.hirschberg_split(block, score_l, score_r)
+                            )
+                    blocks = next_blocks
+
+                for block_pieces in pool.map(hirschberg_block, blocks):
+                    pieces.extend(block_pieces)
+
+        if self.cigar:
+            cigar = []
+            for (piece,) in pieces:
+                for op, length in piece:
+                    append_cigar(cigar, op, length)
+            return cigar
+
+        v_align = gap_symbol(v)[:0].join(v_piece for v_piece, _ in pieces)
+        w_align = gap_symbol(w)[:0].join(w_piece for _, w_piece in pieces)
+        return v_align, w_align
 
-        for i in range(1, n):
-            s[1][0] = i * self.GAP_PENALTY
+    def hirschberg_leaf(self, block):
+        v_lo, v_hi, w_lo, w_hi = block
+        return min(v_hi - v_lo, w_hi - w_lo) <= 1
 
-            for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                match_score = 0
-                if match == 1:
-                    match_score = self.MATCH_SCORE
-                else:
-                    match_score = self.MISSMATCH_PENALTY
+    # Splits a block at the middle row of v, where the forward and reverse
+    # last lines add up to the best score
+    def hirschberg_split(self, block, score_l, score_r):
+        v_lo, v_hi, w_lo, w_hi = block
+        x_mid = v_lo + (v_hi - v_lo) // 2
 
-                from_up = s[0][j] + self.GAP_PENALTY
-                from_left = s[1][j - 1] + self.GAP_PENALTY
-                from_diag = s[0][j - 1] + match_score
+        max_score = float("-inf")
+        y_mid = None  # Max score indx
 
-                s[1][j] = max(from_diag, from_up, from_left)
+        for i in range(w_hi - w_lo):
+            curr_score = score_l[i] + score_r[i]
+            if curr_score > max_score:
+                max_score = curr_score
+                y_mid = w_lo + i
 
-            s[0][:] = s[1][:]
-        return s[1]
+        return (v_lo, x_mid, w_lo, y_mid), (x_mid, v_hi, y_mid, w_hi)
 
-    def hirschberg(self, v, w):
-        v_align = ""
-        w_align = ""
-        n = len(v)
-        m = len(w)
+    # Collects the alignments of the blocks found by hirschberg in order,
+    # to be joined once. A block is (v_lo, v_hi, w_lo, w_hi).
+    def hirschberg_pieces(self, v, w, encoded, block, pieces):
+        v_lo, v_hi, w_lo, w_hi = block
+        n = v_hi - v_lo
+        m = w_hi - w_lo
 
         if n == 0:
-            v_align = m * "-"
-            w_align = w
+            pieces.append(
+                ([("D", m)],) if self.cigar else (m * gap_symbol(v), w[w_lo:w_hi])
+            )
         elif m == 0:
-            v_align = v
-            w_align = n * "-"
+            pieces.append(
+                ([("I", n)],) if self.cigar else (v[v_lo:v_hi], n * gap_symbol(w))
+            )
         elif n == 1 or m == 1:
-            _, v_align, w_align = self.needleman_wunsch(v, w)
+            pieces.append(self.global_alignment(v[v_lo:v_hi], w[w_lo:w_hi])[1:])
         else:
-            x_mid = n // 2
-            score_l = self.needleman_wunsch_last_line(v[:x_mid], w)
-            score_r = self.needleman_wunsch_last_line(v[x_mid:][::-1], w[::-1])[::-1]
-
-            max_score = float("-inf")
-            y_mid = None  # Max score indx
-
-            for i in range(m):
-                curr_score = score_l[i] + score_r[i]
-                if curr_score > max_score:
-                    max_score = curr_score
-                    y_mid = i
-
-            v1_align, w1_align = self.hirschberg(v[:x_mid], w[:y_mid])
-            v2_align, w2_align = self.hirschberg(v[x_mid:], w[y_mid:])
-
-            v_align = v1_align + v2_align
-            w_align = w1_align + w2_align
+            x_mid = v_lo + n // 2
+            score_l = self.last_line(encoded, (v_lo, x_mid, w_lo, w_hi))
+            score_r = self.last_line(encoded, (x_mid, v_hi, w_lo, w_hi), True)[::-1]
 
-        return v_align, w_align
+            for half in self.hirschberg_split(block, score_l, score_r):
+                self.hirschberg_pieces(v, w, encoded, half, pieces)
 
     def affine_gap_penaly_alignment(self, v, w):
         n = len(v) + 1
         m = len(w) + 1
-        middle = [[0 for _ in range(m)] for _ in range(n)]
-        upper = [[0 for _ in range(m)] for _ in range(n)]
-        lower = [[0 for _ in range(m)] for _ in range(n)]
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        middle = [0] * m
+        upper = [0] * m
+        lower = [0] * m
 
-        backtrack = [[None for _ in range(m)] for _ in range(n)]
+        backtrack = self.traceback_matrix(n, m)
 
-        # initialization
         for i in range(1, n):
-            backtrack[i][0] = (i - 1, 0)
+            scores = table[v_codes[i - 1]]
+            prev_middle = middle
+            middle = [0] * m
+            upper = [0] * m
+            row = i * m
+            for j in range(1, m):
+                match_score = scores[w_codes[j - 1]]
+
+                # lower still holds row i - 1 at column j
+                lower[j] = max(lower[j] + self.EPS, prev_middle[j] + self.SIGMA)
+                upper[j] = max(upper[j - 1] + self.EPS, middle[j - 1] + self.SIGMA)
 
+                from_diag = prev_middle[j - 1] + match_score
+                middle[j] = max(from_diag, lower[j], upper[j])
+
+                if middle[j] == from_diag:
+                    backtrack[row + j] = DIAG
+                elif middle[j] == lower[j]:
+                    backtrack[row + j] = UP
+                else:
+                    backtrack[row + j] = LEFT
+
+        cigar, (i, j) = self.traceback_cigar(backtrack, m, n - 1, m - 1)
+        return self.alignment_result(middle[m - 1], cigar, v, w, i, j)
+
+    def score(self, x, y):
+        if self.scoring_matrix is not None:
+            return self.scoring_matrix.score(x, y)
+        if self.match(x, y) == 1:
+            return self.MATCH_SCORE
+        return self.MISSMATCH_PENALTY
+
+    # Rows of (middle, lower, upper) of affine_gap_penaly_alignment for a
+    # block of the matrix. free_top/free_left mark that the block's first
+    # row/column lies on the border of the whole matrix, where every cell
+    # scores 0. Otherwise the block starts at (0, 0) in the given state.
+    def affine_rows(self, v, w, start=MIDDLE, free_top=True, free_left=True):
+        n = len(v) + 1
+        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        minus_inf = float("-inf")
+
+        middle = [minus_inf] * m
+        lower = [minus_inf] * m
+        upper = [minus_inf] * m
+        middle[0] = 0
+        if free_left and not free_top:
+            upper[0] = 0
+        elif not free_left and start == LOWER:
+            lower[0] = 0
         for j in range(1, m):
-            backtrack[0][j] = (0, j - 1)
+            if free_top:
+                middle[j] = 0
+                lower[j] = 0
+            else:
+                upper[j] = max(upper[j - 1] + self.EPS, middle[j - 1] + self.SIGMA)
+                middle[j] = upper[j]
+        yield middle, lower, upper
 
         for i in range(1, n):
+            scores = table[v_codes[i - 1]]
+            prev_middle = middle
+            prev_lower = lower
+            middle = [minus_inf] * m
+            lower = [minus_inf] * m
+            upper = [minus_inf] * m
+            if free_left:
+                middle[0] = 0
+                upper[0] = 0
+            else:
+                lower[0] = max(prev_lower[0] + self.EPS, prev_middle[0] + self.SIGMA)
+                middle[0] = lower[0]
+
             for j in range(1, m):
-                match = self.match(v[i - 1], w[j - 1])
-                match_score = 0
-                if match == 1:
-                    match_score = self.MATCH_SCORE
+                lower[j] = max(prev_lower[j] + self.EPS, prev_middle[j] + self.SIGMA)
+                upper[j] = max(upper[j - 1] + self.EPS, middle[j - 1] + self.SIGMA)
+                from_diag = prev_middle[j - 1] + scores[w_codes[j - 1]]
+                middle[j] = max(from_diag, lower[j], upper[j])
+            yield middle, lower, upper
+
+    # Best score of the rest of the alignment from each cell of the first
+    # row, entered in the middle or lower state, up to the last cell of the
+    # block, which has to be reached in the end state
+    def affine_suffix_line(self, v, w, end=MIDDLE, free_left=False):
+        n = len(v)
+        m = len(w)
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        minus_inf = float("-inf")
+
+        next_middle = None
+        next_lower = None
+        for i in range(n, -1, -1):
+            if i < n:
+                scores = table[v_codes[i]]
+            middle = [minus_inf] * (m + 1)
+            lower = [minus_inf] * (m + 1)
+            upper = [minus_inf] * (m + 1)
+            for j in range(m, -1, -1):
+                free_column = j == 0 and free_left
+                vertical = i < n and not free_column
+
+                best = minus_inf
+                if i == n and j == m and end == MIDDLE:
+                    best = 0
+                if i < n and j < m:
+                    from_diag = scores[w_codes[j]] + next_middle[j + 1]
+                    best = max(best, from_diag)
+                if vertical:
+                    best = max(best, next_lower[j] + self.SIGMA)
+                if j < m:
+                    best = max(best, upper[j + 1] + self.SIGMA)
+                if free_column:
+                    # border cells are all 0, in the middle and upper state
+                    if i < n:
+                        best = max(best, next_middle[0])
+                    if j < m:
+                        best = max(best, upper[1] + self.EPS)
+
+                middle[j] = best
+                lower[j] = best
+                if vertical:
+                    lower[j] = max(best, next_lower[j] + self.EPS)
+                elif i == n and j == m and end == LOWER:
+                    lower[j] = 0
+                upper[j] = best
+                if j < m:
+                    upper[j] = max(best, upper[j + 1] + self.EPS)
+
+            next_middle = middle
+            next_lower = lower
+
+        return next_middle, next_lower
+
+    # Quadratic traceback for blocks of at most one row of v, following the
+    # states of the cells instead of a single direction per cell
+    def affine_block_moves(self, v, w, start, end, free_top, free_left):
+        rows = list(self.affine_rows(v, w, start, free_top, free_left))
+        i = len(v)
+        j = len(w)
+        state = end
+        moves = []
+        while i > 0 or j > 0:
+            middle, lower, upper = rows[i]
+            if state == MIDDLE:
+                if i == 0 and free_top:
+                    moves.append(LEFT)
+                    j -= 1
+                elif j == 0 and free_left:
+                    moves.append(UP)
+                    i -= 1
+                elif (
+                    i > 0
+                    and j > 0
+                    and middle[j]
+                    == rows[i - 1][0][j - 1] + self.score(v[i - 1], w[j - 1])
+                ):
+                    moves.append(DIAG)
+                    i -= 1
+                    j -= 1
+                elif middle[j] == lower[j]:
+                    state = LOWER
                 else:
-                    match_score = self.MISSMATCH_PENALTY
+                    state = UPPER
+            elif state == LOWER:
+                if i == 0:
+                    state = MIDDLE
+                    continue
+                prev_middle, prev_lower, _ = rows[i - 1]
+                if lower[j] != prev_middle[j] + self.SIGMA:
+                    state = LOWER
+                else:
+                    state = MIDDLE
+                moves.append(UP)
+                i -= 1
+            else:
+                if j == 0:
+                    state = MIDDLE
+                    continue
+                if upper[j] != middle[j - 1] + self.SIGMA:
+                    state = UPPER
+                else:
+                    state = MIDDLE
+                moves.append(LEFT)
+                j -= 1
 
-                lower[i][j] = max(
-                    lower[i - 1][j] + self.EPS, middle[i - 1][j] + self.SIGMA
-                )
-                upper[i][j] = max(
-                    upper[i][j - 1] + self.EPS, middle[i][j - 1] + self.SIGMA
-                )
+        moves.reverse()
+        return moves
 
-                middle[i][j] = max(
-                    middle[i - 1][j - 1] + match_score, lower[i][j], upper[i][j]
-                )
+    def myers_miller_moves(self, v, w, start, end, free_top, free_left, moves):
+        n = len(v)
+        if n <= 1:
+            moves += self.affine_block_moves(v, w, start, end, free_top, free_left)
+            return
+
+        x_mid = n // 2
+        for middle, lower, _ in self.affine_rows(
+            v[:x_mid], w, start, free_top, free_left
+        ):
+            pass
+        suffix_middle, suffix_lower = self.affine_suffix_line(
+            v[x_mid:], w, end, free_left
+        )
 
-                if middle[i][j] == middle[i - 1][j - 1] + match_score:  # from_diag
-                    backtrack[i][j] = (i - 1, j - 1)
-                elif middle[i][j] == lower[i][j]:
-                    backtrack[i][j] = (i - 1, j)
-                else:
-                    backtrack[i][j] = (i, j - 1)
+        max_score = float("-inf")
+        y_mid = None
+        mid_state = None
+        for j in range(len(w) + 1):
+            if middle[j] + suffix_middle[j] > max_score:
+                max_score = middle[j] + suffix_middle[j]
+                y_mid = j
+                mid_state = MIDDLE
+            if lower[j] + suffix_lower[j] > max_score:
+                max_score = lower[j] + suffix_lower[j]
+                y_mid = j
+                mid_state = LOWER
+
+        self.myers_miller_moves(
+            v[:x_mid], w[:y_mid], start, mid_state, free_top, free_left, moves
+        )
+        self.myers_miller_moves(
+            v[x_mid:], w[y_mid:], mid_state, end, False, free_left and y_mid == 0, moves
+        )
 
-        v_align, w_align = self.backtracking(
-            backtrack, v, w, n - 1, m - 1, middle, None
+    # Linear space version of affine_gap_penaly_alignment (Myers-Miller):
+    # Hirschberg's split on the middle row, done for the middle and lower
+    # (open vertical gap) states so a gap crossing the row is charged once
+    def myers_miller(self, v, w):
+        for middle, _, _ in self.affine_rows(v, w):
+            pass
+
+        moves = []
+        self.myers_miller_moves(v, w, MIDDLE, MIDDLE, True, True, moves)
+        return self.alignment_result(middle[len(w)], self.moves_cigar(moves), v, w)
+
+    # Extends the exact seed v[i:i + k] == w[j:j + k] in both directions
+    # without gaps, until the score drops x_drop below the best seen.
+    # Returns the best score and the extended range of v.
+    def ungapped_extension(self, v, w, i, j, k, x_drop):
+        best = 0
+        for t in range(k):
+            best += self.score(v[i + t], w[j + t])
+
+        score = best
+        end = i + k
+        t = k
+        while i + t < len(v) and j + t < len(w):
+            score += self.score(v[i + t], w[j + t])
+            t += 1
+            if score > best:
+                best = score
+                end = i + t
+            elif score < best - x_drop:
+                break
+
+        score = best
+        start = i
+        t = 0
+        while i - t > 0 and j - t > 0:
+            t += 1
+            score += self.score(v[i - t], w[j - t])
+            if score > best:
+                best = score
+                start = i - t
+            elif score < best - x_drop:
+                break
+
+        return best, start, end
+
+    # Global-start, free-end alignment of v and w with X-drop pruning: cells
+    # scoring x_drop below the best are dropped and each row only spans the
+    # live columns. Returns the best score, its cell and the moves to it.
+    def gapped_extension(self, v, w, x_drop):
+        n = len(v) + 1
+        m = len(w) + 1
+        table, v_codes, w_codes = self.scoring_table(v, w)
+        gap = self.GAP_PENALTY
+        minus_inf = float("-inf")
+
+        prev = [0]
+        while len(prev) < m and len(prev) * gap >= -x_drop:
+            prev.append(len(prev) * gap)
+        prev_lo = 0
+        rows = [(0, bytearray([STOP]) + bytes([LEFT]) * (len(prev) - 1))]
+        best = 0
+        best_pos = (0, 0)
+
+        for i in range(1, n):
+            scores = table[v_codes[i - 1]]
+            prev_hi = prev_lo + len(prev)
+            curr = []
+            codes = bytearray()
+            j = prev_lo
+            while j < m:
+                from_diag = minus_inf
+                if prev_lo <= j - 1 < prev_hi:
+                    from_diag = prev[j - 1 - prev_lo] + scores[w_codes[j - 1]]
+                from_up = minus_inf
+                if j < prev_hi:
+                    from_up = prev[j - prev_lo] + gap
+                from_left = minus_inf
+                if curr:
+                    from_left = curr[-1] + gap
+                h = max(from_diag, from_up, from_left)
+
+                if h == from_diag:
+                    codes.append(DIAG)
+                elif h == from_up:
+                    codes.append(UP)
+                else:
+                    codes.append(LEFT)
+
+                if h < best - x_drop:
+                    h = minus_inf
+                elif h > best:
+                    best = h
+                    best_pos = (i, j)
+                curr.append(h)
+
+                # past the previous row only left moves can keep cells alive
+                if j >= prev_hi and h == minus_inf:
+                    break
+                j += 1
+
+            live = [k for k, h in enumerate(curr) if h != minus_inf]
+            if not live:
+                break
+            lo = live[0]
+            hi = live[-1] + 1
+            rows.append((prev_lo + lo, codes[lo:hi]))
+            prev = curr[lo:hi]
+            prev_lo += lo
+
+        (i, j) = best_pos
+        moves = []
+        while True:
+            start, codes = rows[i]
+            direction = codes[j - start]
+            if direction == DIAG:
+                i -= 1
+                j -= 1
+            elif direction == UP:
+                i -= 1
+            elif direction == LEFT:
+                j -= 1
+            else:
+                break
+            moves.append(direction)
+
+        moves.reverse()
+        return best, best_pos, moves
+
+    # Local alignment of a read against an indexed reference: exact k-mer
+    # seeds are extended without gaps, then the best max_hits of them with
+    # gapped X-drop extension in both directions. Returns the score, the
+    # alignment and where it starts in v and the reference, or None.
+    def seed_and_extend(self, v, index, x_drop=10, max_hits=3):
+        reference = index.reference
+        k = index.k
+
+        hsps = []
+        extended = {}  # diagonal -> end of the last extension on it
+        for i, j in index.hits(v):
+            if extended.get(j - i, -1) > i:
+                continue
+            score, start, end = self.ungapped_extension(v, reference, i, j, k, x_drop)
+            extended[j - i] = end
+            hsps.append((score, i, j))
+
+        if not hsps:
+            return None
+
+        hsps.sort(key=lambda hsp: -hsp[0])
+        best = None
+        for _, i, j in hsps[:max_hits]:
+            seed_score = sum(self.score(v[i + t], reference[j + t]) for t in range(k))
+
+            right_score, _, right_moves = self.gapped_extension(
+                v[i + k :], reference[j + k : j + k + 2 * (len(v) - i)], x_drop
+            )
+            left_reference = reference[max(0, j - 2 * i) : j]
+            left_score, (left_i, left_j), left_moves = self.gapped_extension(
+                v[:i][::-1], left_reference[::-1], x_drop
+            )
+
+            score = left_score + seed_score + right_score
+            if best is None or score > best[0]:
+                moves = left_moves[::-1] + [DIAG] * k + right_moves
+                best = (score, moves, i - left_i, j - left_j)
+
+        score, moves, i, j = best
+        alignment = self.alignment_result(
+            score, self.moves_cigar(moves), v, reference, i, j
         )
-        print(backtrack)
-        return middle[n - 1][m - 1], v_align, w_align
+        return alignment + ((i, j),)
+
+
+# Symbols of a str, bytes, bytearray or numpy uint8 sequence as bytes, str
+# encoded as latin-1. None for sequences of anything else.
+def sequence_bytes(sequence):
+    if isinstance(sequence, (bytes, bytearray)):
+        return sequence
+    if isinstance(sequence, str):
+        try:
+            return sequence.encode("latin-1")
+        except UnicodeEncodeError:
+            return None
+    if (
+        np is not None
+        and isinstance(sequence, np.ndarray)
+        and sequence.dtype == np.uint8
+    ):
+        return sequence.tobytes()
+    return None
+
+
+def sequence_text(sequence):
+    if isinstance(sequence, str):
+        return sequence
+    return bytes(sequence).decode("latin-1")
+
+
+# Gap of the alignment strings of a sequence: "-" for str, b"-" for bytes
+def gap_symbol(sequence):
+    return "-" if isinstance(sequence, str) else b"-"
+
+
+def append_cigar(cigar, op, length):
+    if length == 0:
+        return
+    if cigar and cigar[-1][0] == op:
+        cigar[-1] = (op, cigar[-1][1] + length)
+    else:
+        cigar.append((op, length))
+
 
+# Substitution scores of a query against every possible target residue in
+# the striped layout used by Alignments.smith_waterman_striped
+class QueryProfile:
+    def __init__(self, query, alignments, lanes=16):
+        self.alignments = alignments
+        self.dtype = alignments.score_dtype()
+        segments = max(1, -(-len(query) // lanes))
+        self.shape = (segments, lanes)
 
+        matrix = alignments.scoring_matrix
+        codes = np.full(segments * lanes, -1, dtype=np.int64)
+        if matrix is None:
+            codes[: len(query)] = alignments.encode(query)
+        else:
+            codes[: len(query)] = list(matrix.encode(query))
+            self.table = np.array(matrix.table, dtype=self.dtype)
+        self.codes = codes.reshape(lanes, segments).T
+        offsets = np.arange(segments, dtype=self.dtype) * alignments.GAP_PENALTY
+        self.offsets = offsets[:, None]
+        self.profiles = {}
+
+    # residue is a symbol of a str target or a byte of a bytes-like one
+    def scores(self, residue):
+        if residue not in self.profiles:
+            al = self.alignments
+            if al.scoring_matrix is None:
+                code = ord(residue) if isinstance(residue, str) else residue
+                profile = np.where(
+                    self.codes == code, al.MATCH_SCORE, al.MISSMATCH_PENALTY
+                ).astype(self.dtype)
+            else:
+                column = self.table[:, al.scoring_matrix.encode([residue])[0]]
+                profile = column[self.codes]
+            # padding after the end of the query never scores
+            profile[self.codes < 0] = -(2**40)
+            self.profiles[residue] = profile
+        return self.profiles[residue]
+
+
+# Positions of every k-mer of the reference, keyed by pattern_to_number
+class KmerIndex:
+    def __init__(self, reference, k=11):
+        self.reference = reference
+        self.k = k
+        self.positions = {}
+        for position, number in rolling_pattern_numbers(sequence_text(reference), k):
+            self.positions.setdefault(number, []).append(position)
+
+    # Yields (i, j) for every k-mer of the query at i found at j
+    def hits(self, query):
+        for i, number in rolling_pattern_numbers(sequence_text(query), self.k):
+            for j in self.positions.get(number, []):
+                yield i, j
+
+
+# Alignment results by a digest of the method, the scoring parameters and
+# both sequences. Results are kept pickled in an LRU bound by max_bytes, and
+# with a path also in an SQLite table that outlives the process. A pickled
+# cache starts with an empty memory tier, no connection and zero counters;
+# align_many workers get such a copy whether they are forked or spawned,
+# add their counters to the parent's, and share results with other
+# processes only through the SQLite table.
+class AlignmentCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, path=None):
+        self.max_bytes = max_bytes
+        self.path = path
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.connection = None
+        self.pid = None
+
+    def __getstate__(self):
+        return {"max_bytes": self.max_bytes, "path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    # Hashes the type and full contents of every part; repr is not enough
+    # since numpy abbreviates long arrays
+    def key(self, *parts):
+        digest = hashlib.sha256()
+        for part in parts:
+            content = sequence_bytes(part)
+            if content is None:
+                content = pickle.dumps(part)
+            name = type(part).__qualname__.encode()
+            digest.update(b"%d:%s:%d:" % (len(name), name, len(content)))
+            digest.update(content)
+        return digest.hexdigest()
+
+    # SQLite connections must not be used across fork(), so a forked
+    # process opens its own
+    def database(self):
+        if self.connection is None or self.pid != os.getpid():
+            self.connection = sqlite3.connect(self.path, timeout=60)
+            self.pid = os.getpid()
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS alignments (key TEXT PRIMARY KEY, result BLOB)"
+            )
+        return self.connection
+
+    def get(self, key):
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return pickle.loads(self.entries[key])
+
+        if self.path is not None:
+            row = (
+                self.database()
+                .execute("SELECT result FROM alignments WHERE key = ?", (key,))
+                .fetchone()
+            )
+            if row is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                self.remember(key, row[0])
+                return pickle.loads(row[0])
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        data = pickle.dumps(result)
+        self.remember(key, data)
+        if self.path is not None:
+            with self.database() as connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO alignments VALUES (?, ?)", (key, data)
+                )
+
+    # Adds to the memory tier, evicting the least recently used results
+    def remember(self, key, data):
+        if key in self.entries:
+            self.size -= len(self.entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+        self.entries[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def counters(self):
+        return (self.hits, self.disk_hits, self.misses)
+
+    def add_counters(self, counters):
+        hits, disk_hits, misses = counters
+        self.hits += hits
+        self.disk_hits += disk_hits
+        self.misses += misses
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self.entries),
+            "bytes": self.size,
+        }
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+        if self.path is not None:
+            with self.database() as connection:
+                connection.execute("DELETE FROM alignments")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+# Worker side of Alignments.align_many: the aligner is sent to every
+# process once instead of with every pair
+worker_alignments = None
+worker_mode = None
+
+
+def init_worker(alignments, mode):
+    global worker_alignments, worker_mode
+    if alignments.cache is not None:
+        # a forked worker would otherwise share the parent's cache state
+        alignments.cache = pickle.loads(pickle.dumps(alignments.cache))
+    worker_alignments = alignments
+    worker_mode = mode
+
+
+# Returns the result and, with a cache, the worker's counter increments
+def align_pair(pair):
+    v, w = pair
+    cache = worker_alignments.cache
+    if cache is None:
+        return worker_alignments.align(v, w, worker_mode), None
+
+    before = cache.counters()
+    result = worker_alignments.align(v, w, worker_mode)
+    counters = tuple(after - b for after, b in zip(cache.counters(), before))
+    return result, counters
+
+
+# Worker side of Alignments.hirschberg: both sequences and their codes are
+# sent once, tasks only carry index ranges into them
+worker_sequences = None
+
+
+def init_hirschberg_worker(alignments, v, w, encoded):
+    global worker_alignments, worker_sequences
+    worker_alignments = alignments
+    worker_sequences = (v, w, encoded)
+
+
+def hirschberg_line(task):
+    block, reverse = task
+    v, w, encoded = worker_sequences
+    v_lo, v_hi, w_lo, w_hi = block
+    x_mid = v_lo + (v_hi - v_lo) // 2
+    if reverse:
+        return worker_alignments.last_line(encoded, (x_mid, v_hi, w_lo, w_hi), True)
+    return worker_alignments.last_line(encoded, (v_lo, x_mid, w_lo, w_hi))
+
+
+def hirschberg_block(block):
+    v, w, encoded = worker_sequences
+    pieces = []
+    worker_alignments.hirschberg_pieces(v, w, encoded, block, pieces)
+    return pieces
+
+
+import random
+import tempfile
 import unittest
+from unittest import mock
+
+
+def random_sequence(length, alphabet="ACGT", rng=random):
+    return "".join(rng.choice(alphabet) for _ in range(length))
 
 
 class TestAlignment(unittest.TestCase):
@@ -318,12 +1938,44 @@ class TestAlignment(unittest.TestCase):
             (6, "ACTACGC", "--TATGC-"), al.affine_gap_penaly_alignment(v, w)
         )
 
+    def test_myers_miller(self):
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        self.assertEqual(
+            al.affine_gap_penaly_alignment("AGTACGCA", "TATGC"),
+            al.myers_miller("AGTACGCA", "TATGC"),
+        )
+
+    def test_myers_miller_score(self):
+        rng = random.Random(5)
+        for params in [(-1, 1, -1, -3, -1), (-2, 3, -1, -4, -0.5), (-1, 1, 0, -1, -2)]:
+            al = Alignments(*params)
+            for _ in range(50):
+                v = random_sequence(rng.randint(0, 20), rng=rng)
+                w = random_sequence(rng.randint(0, 20), rng=rng)
+                score, v_align, w_align = al.myers_miller(v, w)
+                self.assertEqual(al.affine_gap_penaly_alignment(v, w)[0], score)
+                # every column of w is either matched or a gap in v_align
+                self.assertEqual(len(w), len(v_align))
+                self.assertEqual(len(v), len(w_align))
+
     def test_hirschberg(self):
         alignment = Alignments(-2, 2, -1)
         v = "AGTACGCA"
         w = "TATGC"
         self.assertEqual(("AGTACGC", "--TATGC-"), alignment.hirschberg(v, w))
 
+    def test_hirschberg_workers(self):
+        rng = random.Random(16)
+        alignment = Alignments(-2, 2, -1)
+        v = random_sequence(200, rng=rng)
+        w = random_sequence(150, rng=rng)
+        self.assertEqual(
+            alignment.hirschberg(v, w), alignment.hirschberg(v, w, workers=3)
+        )
+        self.assertEqual(
+            ("AGTACGC", "--TATGC-"), alignment.hirschberg("AGTACGCA", "TATGC", 2)
+        )
+
     def test_needleman_wunsch_last_line(self):
         alignments = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=0)
         v = "ABCAD"
@@ -358,14 +2010,528 @@ class TestAlignment(unittest.TestCase):
 
         self.assertEqual((1, "TACGC", "--TATGC-"), alignments.needleman_wunsch(v, w))
 
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_engine_matches_python(self):
+        rng = random.Random(7)
+        for params in [
+            (-1, 1, 0),
+            (-2, 2, -1),
+            (-1.5, 1, -0.5),
+            (-0.25, 1.125, -0.75),
+            (-0.1, 1, -0.3),
+        ]:
+            python_al = Alignments(*params)
+            numpy_al = Alignments(*params, engine="numpy")
+            for _ in range(40):
+                v = random_sequence(rng.randint(0, 30), rng=rng)
+                w = random_sequence(rng.randint(0, 30), rng=rng)
+                self.assertEqual(
+                    python_al.needleman_wunsch(v, w), numpy_al.needleman_wunsch(v, w)
+                )
+                self.assertEqual(
+                    python_al.smith_waterman(v, w), numpy_al.smith_waterman(v, w)
+                )
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_numpy_engine(self):
+        al = Alignments(
+            gap_penalty=-1, match_score=1, missmatch_penalty=0, engine="numpy"
+        )
+        self.assertEqual((1, "ABAD", "AB-DE"), al.needleman_wunsch("ABCAD", "ABDE"))
+        v = "OIUGNOISGRVISDIOGHIODSHFGMLSVEODRGMSOVFOGHLSDGMOVIDFHGS"
+        w = "DSHGMLSEOD"
+        self.assertEqual((8, "DSHGMLSEOD", "DSH-GMLS-EOD"), al.smith_waterman(v, w))
+
+    def test_myers_edit_distance(self):
+        al = Alignments()
+        rng = random.Random(11)
+        for _ in range(100):
+            v = random_sequence(rng.randint(0, 80), rng=rng)
+            w = random_sequence(rng.randint(0, 80), rng=rng)
+            self.assertEqual(
+                al.edit_distance(v, w)[0], al.edit_distance(v, w, distance_only=True)
+            )
+
+    def test_myers_edit_distance_max_distance(self):
+        al = Alignments()
+        self.assertEqual(3, al.myers_edit_distance("kitten", "sitting"))
+        self.assertEqual(3, al.myers_edit_distance("kitten", "sitting", 3))
+        self.assertIsNone(al.myers_edit_distance("kitten", "sitting", 2))
+        self.assertIsNone(al.edit_distance("A" * 10, "A", True, max_distance=5))
+
+    def test_traceback_matrix(self):
+        al = Alignments()
+        backtrack = al.traceback_matrix(3, 4)
+        self.assertEqual(12, len(backtrack))
+        self.assertEqual(bytes([STOP, LEFT, LEFT, LEFT]), backtrack[:4])
+        self.assertEqual([UP, UP], [backtrack[4], backtrack[8]])
+        self.assertEqual(bytes(12), al.traceback_matrix(3, 4, local=True))
+
+    def test_needleman_wunsch_banded(self):
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        v = "AGTACGCA"
+        w = "TATGC"
+        self.assertEqual(
+            al.needleman_wunsch(v, w), al.needleman_wunsch_banded(v, w, len(v))
+        )
+        score, _, _ = al.needleman_wunsch_banded(v, w, 0)
+        self.assertLessEqual(score, al.needleman_wunsch(v, w)[0])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_banded_numpy_matches_python(self):
+        rng = random.Random(4)
+        for params in [(-1, 1, 0), (-2, 2, -1), (-1.5, 1, -0.5)]:
+            al = Alignments(*params)
+            for _ in range(40):
+                v = random_sequence(rng.randint(0, 30), rng=rng)
+                w = random_sequence(rng.randint(0, 30), rng=rng)
+                band = rng.randint(0, 10)
+                expected = al.needleman_wunsch_banded_numpy(v, w, band)
+                with mock.patch.dict(globals(), np=None):
+                    self.assertEqual(expected, al.needleman_wunsch_banded(v, w, band))
+
+    def test_needleman_wunsch_adaptive(self):
+        rng = random.Random(3)
+        for params in [(-1, 1, 0), (-2, 2, -1)]:
+            al = Alignments(*params)
+            for _ in range(30):
+                v = random_sequence(rng.randint(20, 60), rng=rng)
+                w = list(v)
+                for _ in range(rng.randint(0, 5)):
+                    pos = rng.randrange(len(w))
+                    edit = rng.choice(["sub", "ins", "del"])
+                    if edit == "sub":
+                        w[pos] = rng.choice("ACGT")
+                    elif edit == "ins":
+                        w.insert(pos, rng.choice("ACGT"))
+                    else:
+                        del w[pos]
+                w = "".join(w)
+                self.assertEqual(
+                    al.needleman_wunsch(v, w), al.needleman_wunsch_adaptive(v, w, 1)
+                )
+
+        al = Alignments(gap_penalty=-1, scoring_matrix="BLOSUM62")
+        v = "DDYYAMNSEKYRFSWLE"
+        w = "YAMNSEKYRFSWLEWWW"
+        self.assertEqual(
+            al.needleman_wunsch(v, w), al.needleman_wunsch_adaptive(v, w, 1)
+        )
+        for _ in range(30):
+            v = random_sequence(rng.randint(5, 40), "ACDEFGHIKLMNPQRSTVWY", rng)
+            w = random_sequence(rng.randint(5, 40), "ACDEFGHIKLMNPQRSTVWY", rng)
+            self.assertEqual(
+                al.needleman_wunsch(v, w), al.needleman_wunsch_adaptive(v, w, 1)
+            )
+
+        # ties with alignments outside the band, scored with rounded floats
+        al = Alignments(-0.1, 1, -0.3)
+        for v, w in [("CG", "TCC"), ("GGAGGCCGGGCCA", "GGAGGACAGGCCA")]:
+            self.assertEqual(
+                al.needleman_wunsch(v, w), al.needleman_wunsch_adaptive(v, w, 1)
+            )
+
+    def test_align_many(self):
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        rng = random.Random(13)
+        pairs = [
+            (random_sequence(rng.randint(1, 15), rng=rng), random_sequence(10, rng=rng))
+            for _ in range(40)
+        ]
+        for mode in ["global", "local", "affine"]:
+            expected = [al.align(v, w, mode) for v, w in pairs]
+            self.assertEqual(expected, list(al.align_many(pairs, mode)))
+            self.assertEqual(
+                expected, list(al.align_many(pairs, mode, workers=2, chunk_size=3))
+            )
+
+    def test_all_vs_all(self):
+        al = Alignments()
+        sequences = ["ACGT", "AGT", "CCGT"]
+        results = dict(al.all_vs_all(sequences, mode="edit", workers=2))
+        self.assertEqual([(0, 1), (0, 2), (1, 2)], sorted(results))
+        self.assertEqual(al.edit_distance("AGT", "CCGT"), results[(1, 2)])
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_smith_waterman_striped(self):
+        rng = random.Random(17)
+        for params in [(-1, 1, 0), (-2, 2, -1), (-1.5, 1, -0.5)]:
+            al = Alignments(*params)
+            for lanes in [1, 4, 16]:
+                for _ in range(15):
+                    v = random_sequence(rng.randint(0, 40), rng=rng)
+                    w = random_sequence(rng.randint(0, 40), rng=rng)
+                    profile = QueryProfile(v, al, lanes)
+                    self.assertEqual(
+                        al.smith_waterman(v, w)[0],
+                        al.smith_waterman_striped(v, w, profile),
+                    )
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_smith_waterman_search(self):
+        al = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=0)
+        query = "DSHGMLSEOD"
+        targets = ["AAAA", "OIUGNOISGRVISDIOGHIODSHFGMLSVEODRGMSOVFOGHLS", "DSHG"]
+        hits = list(al.smith_waterman_search(query, targets, threshold=5))
+        self.assertEqual([1], [index for index, _ in hits])
+        self.assertEqual(al.smith_waterman(query, targets[1]), hits[0][1])
+
+    def test_scoring_matrix(self):
+        al = Alignments(gap_penalty=-4, scoring_matrix="BLOSUM62")
+        score, v_align, w_align = al.needleman_wunsch("HEAGAWGHEE", "PAWHEAE")
+        self.assertEqual(
+            al.needleman_wunsch_last_line("HEAGAWGHEE", "PAWHEAE")[-1], score
+        )
+        self.assertEqual(al.score("W", "W"), al.smith_waterman("W", "W")[0])
+        self.assertEqual(11, al.score("W", "W"))
+        with self.assertRaises(ValueError):
+            al.needleman_wunsch("HEAJ", "PAW")
+
+    def test_scoring_matrix_engines(self):
+        rng = random.Random(19)
+        alphabet = "ARNDCQEGHILKMFPSTWYV"
+        for matrix in ["BLOSUM62", "PAM250"]:
+            al = Alignments(gap_penalty=-5, sigma=-11, eps=-1, scoring_matrix=matrix)
+            for _ in range(10):
+                v = random_sequence(rng.randint(0, 25), alphabet, rng)
+                w = random_sequence(rng.randint(0, 25), alphabet, rng)
+                self.assertEqual(
+                    al.needleman_wunsch(v, w),
+                    al.needleman_wunsch_banded(v, w, max(len(v), len(w))),
+                )
+                self.assertEqual(
+                    al.affine_gap_penaly_alignment(v, w)[0], al.myers_miller(v, w)[0]
+                )
+                if np is None:
+                    continue
+                numpy_al = Alignments(
+                    gap_penalty=-5, scoring_matrix=matrix, engine="numpy"
+                )
+                self.assertEqual(
+                    al.needleman_wunsch(v, w), numpy_al.needleman_wunsch(v, w)
+                )
+                self.assertEqual(al.smith_waterman(v, w), numpy_al.smith_waterman(v, w))
+                self.assertEqual(
+                    al.smith_waterman(v, w)[0], al.smith_waterman_striped(v, w)
+                )
+
+    def test_seed_and_extend(self):
+        rng = random.Random(23)
+        reference = random_sequence(5000, rng=rng)
+        index = KmerIndex(reference, k=11)
+        al = Alignments(gap_penalty=-2, match_score=1, missmatch_penalty=-2)
+        for position in [0, 1234, 4850]:
+            read = list(reference[position : position + 150])
+            read[40] = "A" if read[40] != "A" else "C"
+            del read[90]
+            read = "".join(read)
+
+            score, v_align, w_align, start = al.seed_and_extend(read, index)
+            window = reference[position : position + 150]
+            self.assertEqual(al.smith_waterman(read, window)[0], score)
+            self.assertEqual(position, start[1])
+
+    def test_seed_and_extend_no_hits(self):
+        index = KmerIndex("ACGTACGTACGTACGT", k=5)
+        self.assertIsNone(Alignments().seed_and_extend("TTTTTTTT", index))
+
+    def test_gapped_extension(self):
+        al = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=-1)
+        score, end, moves = al.gapped_extension("ACGTTT", "ACTTTGGG", x_drop=3)
+        self.assertEqual(4, score)
+        self.assertEqual((6, 5), end)
+        self.assertEqual([DIAG, DIAG, UP, DIAG, DIAG, DIAG], moves)
+
+    def test_cigar(self):
+        al = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=0, cigar=True)
+        score, cigar = al.needleman_wunsch("ABCAD", "ABDE")
+        self.assertEqual((1, [("M", 2), ("I", 1), ("M", 2)]), (score, cigar))
+        self.assertEqual(("ABAD", "AB-DE"), al.cigar_alignment(cigar, "ABCAD", "ABDE"))
+
+    def test_cigar_matches_strings(self):
+        rng = random.Random(29)
+        al = Alignments(-2, 2, -1)
+        cigar_al = Alignments(-2, 2, -1, cigar=True)
+        for _ in range(30):
+            v = random_sequence(rng.randint(0, 20), rng=rng)
+            w = random_sequence(rng.randint(0, 20), rng=rng)
+            for method in ["needleman_wunsch", "edit_distance", "myers_miller"]:
+                score, cigar = getattr(cigar_al, method)(v, w)
+                expected = getattr(al, method)(v, w)
+                self.assertEqual(expected, (score,) + al.cigar_alignment(cigar, v, w))
+            for method, args in [
+                ("needleman_wunsch_adaptive", (1,)),
+                ("needleman_wunsch_banded", (4,)),
+            ]:
+                score, cigar = getattr(cigar_al, method)(v, w, *args)
+                expected = getattr(al, method)(v, w, *args)
+                self.assertEqual(expected, (score,) + al.cigar_alignment(cigar, v, w))
+            self.assertEqual(
+                len(v),
+                sum(length for op, length in cigar_al.hirschberg(v, w) if op != "D"),
+            )
+
+    def test_fitting_alignment(self):
+        al = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=-1)
+        self.assertEqual(
+            (2, "TAGTTA", "T-A-GATA"), al.fitting_alignment("GTAGGCTTAAGGTTA", "TAGATA")
+        )
+
+    def test_overlap_alignment(self):
+        al = Alignments(gap_penalty=-2, match_score=1, missmatch_penalty=-2)
+        self.assertEqual(
+            (1, "HEA", "HEA-"), al.align("PAWHEAE", "HEAGAWGHEE", "overlap")
+        )
+
+    def test_semi_global_alignment(self):
+        al = Alignments(gap_penalty=-1, match_score=1, missmatch_penalty=-1)
+        v = "CAGCACTTGGATTCTCGG"
+        w = "CAGCGTGG"
+        self.assertEqual(4, al.semi_global_alignment(v, w)[0])
+        self.assertEqual(-2, al.needleman_wunsch(v, w)[0])
+
+    def test_free_end_modes_match_trimmed_global(self):
+        rng = random.Random(13)
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        for _ in range(20):
+            v = random_sequence(rng.randint(0, 8), rng=rng)
+            w = random_sequence(rng.randint(0, 8), rng=rng)
+            n = len(v)
+            m = len(w)
+            fitting = max(
+                al.needleman_wunsch(v[a:b], w)[0]
+                for a in range(n + 1)
+                for b in range(a, n + 1)
+            )
+            overlap = max(
+                al.needleman_wunsch(v[a:], w[:b])[0]
+                for a in range(n + 1)
+                for b in range(m + 1)
+            )
+            self.assertEqual(fitting, al.fitting_alignment(v, w)[0])
+            self.assertEqual(overlap, al.overlap_alignment(v, w)[0])
+
+    def test_alignment_cache(self):
+        cache = AlignmentCache()
+        al = Alignments(-2, 2, -1, cache=cache)
+        expected = Alignments(-2, 2, -1).needleman_wunsch("AGTACGCA", "TATGC")
+        self.assertEqual(expected, al.needleman_wunsch("AGTACGCA", "TATGC"))
+        self.assertEqual(expected, al.needleman_wunsch("AGTACGCA", "TATGC"))
+        al.smith_waterman("AGTACGCA", "TATGC")
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(2, cache.misses)
+
+        # other scoring parameters do not share results
+        other = Alignments(-1, 1, 0, cache=cache)
+        self.assertEqual(
+            Alignments(-1, 1, 0).needleman_wunsch("AGTACGCA", "TATGC"),
+            other.needleman_wunsch("AGTACGCA", "TATGC"),
+        )
+        self.assertEqual(3, cache.misses)
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_alignment_cache_long_arrays(self):
+        al = Alignments(-2, 2, -1, cache=AlignmentCache())
+        w = np.frombuffer(b"ACGTTT", dtype=np.uint8)
+        for middle in ["A", "C"]:
+            v = np.frombuffer(("ACG" + middle * 2000 + "TTT").encode(), np.uint8)
+            self.assertEqual(
+                Alignments(-2, 2, -1).needleman_wunsch(v, w)[0],
+                al.needleman_wunsch(v, w)[0],
+            )
+        self.assertEqual(2, al.cache.misses)
+
+        # the same contents as another type are a different input
+        al.needleman_wunsch(v.tobytes(), w.tobytes())
+        self.assertEqual(3, al.cache.misses)
+
+    def test_alignment_cache_max_bytes(self):
+        al = Alignments(cache=AlignmentCache(max_bytes=60))
+        for v in ["ACGT", "ACGA", "ACGC", "ACGG"]:
+            al.needleman_wunsch(v, "ACG")
+        self.assertLessEqual(al.cache.size, 60)
+        self.assertLess(al.cache.stats()["entries"], 4)
+        al.needleman_wunsch("ACGG", "ACG")
+        self.assertEqual(1, al.cache.hits)
+
+    def test_alignment_cache_on_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "alignments.sqlite")
+            cache = AlignmentCache(path=path)
+            result = Alignments(cache=cache).smith_waterman("AGTACGCA", "TATGC")
+            cache.close()
+
+            cache = AlignmentCache(path=path)
+            al = Alignments(cache=cache)
+            self.assertEqual(result, al.smith_waterman("AGTACGCA", "TATGC"))
+            self.assertEqual(
+                {"hits": 1, "disk_hits": 1, "misses": 0},
+                {name: cache.stats()[name] for name in ("hits", "disk_hits", "misses")},
+            )
+            self.assertEqual(
+                [result], list(al.align_many([("AGTACGCA", "TATGC")], "local", 2))
+            )
+            # the worker found it on disk and reported back
+            self.assertEqual(
+                {"hits": 2, "disk_hits": 2, "misses": 0},
+                {name: cache.stats()[name] for name in ("hits", "disk_hits", "misses")},
+            )
+
+            # a forked process does not reuse the parent's connection
+            connection = cache.database()
+            self.assertIs(connection, cache.database())
+            cache.pid = None
+            self.assertIsNot(connection, cache.database())
+            connection.close()
+            cache.close()
+
+    def test_alignment_cache_counts_workers(self):
+        cache = AlignmentCache()
+        al = Alignments(-2, 2, -1, cache=cache)
+        al.needleman_wunsch("ACGT", "ACG")
+        pairs = [("ACGT", "ACG"), ("TTGA", "TGA")] * 4
+        expected = [Alignments(-2, 2, -1).needleman_wunsch(v, w) for v, w in pairs]
+        self.assertEqual(expected, list(al.align_many(pairs, "global", 2, 1)))
+        self.assertEqual(1 + len(pairs), cache.hits + cache.misses)
+        # workers start empty, so ACGT misses again besides TTGA
+        self.assertGreaterEqual(cache.misses, 3)
+
+    def test_top_k_local(self):
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        v = "TTGCATGCATCCCCCCGCATGCAAGG"
+        w = "GCATGCA"
+        alignments = al.top_k_local(v, w, 3)
+        self.assertEqual(al.smith_waterman(v, w), alignments[0])
+        self.assertEqual([14, 14], [score for score, _, _ in alignments[:2]])
+
+    def test_top_k_local_first_is_smith_waterman(self):
+        rng = random.Random(31)
+        al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1)
+        for _ in range(20):
+            v = random_sequence(rng.randint(0, 30), rng=rng)
+            w = random_sequence(rng.randint(0, 30), rng=rng)
+            alignments = al.top_k_local(v, w, 4)
+            if alignments:
+                self.assertEqual(al.smith_waterman(v, w), alignments[0])
+            scores = [score for score, _, _ in alignments]
+            self.assertEqual(sorted(scores, reverse=True), scores)
+
+    def test_wavefront_engine(self):
+        rng = random.Random(12)
+        for params in [(-1, 1, 0), (-2, 2, -1), (-3, 5, -4)]:
+            al = Alignments(*params)
+            wavefront_al = Alignments(*params, engine="wavefront")
+            for _ in range(30):
+                v = random_sequence(rng.randint(0, 40), rng=rng)
+                w = list(v)
+                for _ in range(rng.randint(0, 4)):
+                    p = rng.randrange(len(w) + 1)
+                    w[p : p + rng.randint(0, 1)] = rng.choice(["", "T", "GA"])
+                w = "".join(w)
+                self.assertEqual(
+                    al.needleman_wunsch(v, w)[0], wavefront_al.needleman_wunsch(v, w)[0]
+                )
+                self.assertEqual(
+                    al.edit_distance(v, w)[0], wavefront_al.edit_distance(v, w)[0]
+                )
+
+    def test_wavefront_cigar(self):
+        al = Alignments(engine="wavefront", cigar=True)
+        self.assertEqual(
+            (1, [("M", 2), ("D", 1), ("M", 3)]), al.edit_distance("ACGTA", "ACTGTA")
+        )
+        self.assertEqual((0, []), al.edit_distance("", ""))
+
+    def test_wavefront_invalid_scoring(self):
+        al = Alignments(gap_penalty=0, match_score=0, engine="wavefront")
+        with self.assertRaises(ValueError):
+            al.needleman_wunsch("ACGT", "AGT")
+
+    def test_bytes_input(self):
+        rng = random.Random(20)
+        al = Alignments(-2, 2, -1)
+        for _ in range(10):
+            v = random_sequence(rng.randint(0, 30), rng=rng)
+            w = random_sequence(rng.randint(0, 30), rng=rng)
+            for method in (al.needleman_wunsch, al.smith_waterman, al.hirschberg):
+                expected = method(v, w)
+                expected = tuple(
+                    part.encode() if isinstance(part, str) else part
+                    for part in expected
+                )
+                self.assertEqual(expected, method(v.encode(), bytearray(w.encode())))
+            self.assertEqual(
+                al.edit_distance(v, w)[0], al.edit_distance(v.encode(), w)[0]
+            )
+            self.assertEqual(
+                al.lcs_linear_space(v, w).encode(),
+                al.lcs_linear_space(v.encode(), w.encode()),
+            )
+
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_uint8_input(self):
+        al = Alignments(-2, 2, -1, scoring_matrix="BLOSUM62")
+        v = np.frombuffer(b"HEAGAWGHEE", dtype=np.uint8)
+        w = np.frombuffer(b"PAWHEAE", dtype=np.uint8)
+        score, v_align, w_align = al.smith_waterman("HEAGAWGHEE", "PAWHEAE")
+        self.assertEqual(
+            (score, v_align.encode(), w_align.encode()), al.smith_waterman(v, w)
+        )
+        self.assertEqual(score, al.smith_waterman_striped(v, w))
+
+    def test_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            Alignments(engine="gpu")
+
     def test_lcs_backtrack(self):
         alignmnent = Alignments()
         self.assertEqual("ABD", alignmnent.lcs_backtrack("ABCD", "ABED"))
 
+    def test_lcs_length(self):
+        rng = random.Random(14)
+        alignmnent = Alignments()
+        self.assertEqual(3, alignmnent.lcs_length("ABCD", "ABED"))
+        for _ in range(50):
+            v = random_sequence(rng.randint(0, 20), rng=rng)
+            w = random_sequence(rng.randint(0, 20), rng=rng)
+            self.assertEqual(
+                len(alignmnent.lcs_backtrack(v, w)), alignmnent.lcs_length(v, w)
+            )
+
+    def test_lcs_linear_space(self):
+        rng = random.Random(15)
+        alignmnent = Alignments()
+        self.assertEqual("ABD", alignmnent.lcs_linear_space("ABCD", "ABED"))
+        self.assertEqual(
+            [1, 2, 4], alignmnent.lcs_linear_space([1, 2, 3, 4], [1, 2, 5, 4])
+        )
+        for _ in range(50):
+            v = random_sequence(rng.randint(0, 20), rng=rng)
+            w = random_sequence(rng.randint(0, 20), rng=rng)
+            lcs = alignmnent.lcs_linear_space(v, w)
+            self.assertEqual(len(alignmnent.lcs_backtrack(v, w)), len(lcs))
+            for sequence in (v, w):
+                symbols = iter(sequence)
+                self.assertTrue(all(symbol in symbols for symbol in lcs))
+
     def test_edit_distance(self):
         alignmnent = Alignments()
         self.assertEqual("AB-D", alignmnent.edit_distance("ABD", "ABCD")[1])
 
+    def test_edit_distance_within(self):
+        rng = random.Random(17)
+        alignmnent = Alignments()
+        self.assertEqual(1, alignmnent.edit_distance_within("ABD", "ABCD", 1))
+        self.assertIsNone(alignmnent.edit_distance_within("ABD", "ABCD", 0))
+        self.assertIsNone(alignmnent.edit_distance_within("AAAA", "TTTTTTTT", 3))
+        for _ in range(100):
+            v = random_sequence(rng.randint(0, 15), rng=rng)
+            w = random_sequence(rng.randint(0, 15), rng=rng)
+            k = rng.randint(0, 10)
+            distance = alignmnent.edit_distance(v, w)[0]
+            expected = distance if distance <= k else None
+            self.assertEqual(expected, alignmnent.edit_distance_within(v, w, k))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,235 @@
+"""Alignment throughput benchmark: runs the Alignments methods on seeded
+random sequence pairs over a grid of lengths and similarities and reports
+wall time, GCUPS (10^9 DP cells of len(v) * len(w) per second) and peak RSS.
+
+    python benchmark.py --lengths 200 1000 --similarities 0.7 0.99 -o run.json
+    python benchmark.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import resource
+import sys
+import time
+from multiprocessing import get_context
+
+from alignments import Alignments, np
+
+# name -> (Alignments keyword arguments, call on (alignments, v, w))
+BENCHMARKS = {
+    "needleman_wunsch": ({}, lambda al, v, w: al.needleman_wunsch(v, w)),
+    "smith_waterman": ({}, lambda al, v, w: al.smith_waterman(v, w)),
+    "semi_global_alignment": ({}, lambda al, v, w: al.semi_global_alignment(v, w)),
+    "edit_distance": ({}, lambda al, v, w: al.edit_distance(v, w)),
+    "myers_edit_distance": ({}, lambda al, v, w: al.myers_edit_distance(v, w)),
+    "edit_distance_within": ({}, lambda al, v, w: al.edit_distance_within(v, w, 16)),
+    "lcs_backtrack": ({}, lambda al, v, w: al.lcs_backtrack(v, w)),
+    "lcs_length": ({}, lambda al, v, w: al.lcs_length(v, w)),
+    "lcs_linear_space": ({}, lambda al, v, w: al.lcs_linear_space(v, w)),
+    "needleman_wunsch_adaptive": (
+        {},
+        lambda al, v, w: al.needleman_wunsch_adaptive(v, w),
+    ),
+    "hirschberg": ({}, lambda al, v, w: al.hirschberg(v, w)),
+    "affine_gap_penaly_alignment": (
+        {},
+        lambda al, v, w: al.affine_gap_penaly_alignment(v, w),
+    ),
+    "myers_miller": ({}, lambda al, v, w: al.myers_miller(v, w)),
+    "top_k_local": ({}, lambda al, v, w: al.top_k_local(v, w, 3)),
+    "smith_waterman_striped": ({}, lambda al, v, w: al.smith_waterman_striped(v, w)),
+    "needleman_wunsch_wavefront": (
+        {"engine": "wavefront"},
+        lambda al, v, w: al.needleman_wunsch(v, w),
+    ),
+    "edit_distance_wavefront": (
+        {"engine": "wavefront"},
+        lambda al, v, w: al.edit_distance(v, w),
+    ),
+    "needleman_wunsch_numpy": (
+        {"engine": "numpy"},
+        lambda al, v, w: al.needleman_wunsch(v, w),
+    ),
+    "smith_waterman_numpy": (
+        {"engine": "numpy"},
+        lambda al, v, w: al.smith_waterman(v, w),
+    ),
+}
+
+NUMPY_BENCHMARKS = (
+    "smith_waterman_striped",
+    "needleman_wunsch_numpy",
+    "smith_waterman_numpy",
+)
+
+
+# w is v with every position mutated with probability 1 - similarity, half
+# of the mutations substitutions and the rest insertions and deletions
+def sequence_pair(length, similarity, rng, alphabet="ACGT"):
+    v = "".join(rng.choice(alphabet) for _ in range(length))
+    w = []
+    for symbol in v:
+        if rng.random() >= 1 - similarity:
+            w.append(symbol)
+            continue
+        mutation = rng.random()
+        if mutation < 0.5:
+            w.append(rng.choice(alphabet))
+        elif mutation < 0.75:
+            w.append(symbol + rng.choice(alphabet))
+    return v, "".join(w)
+
+
+def peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def run_case(case):
+    name, length, similarity, seed, repeat = case
+    options, call = BENCHMARKS[name]
+    rng = random.Random(f"{seed}-{length}-{similarity}")
+    v, w = sequence_pair(length, similarity, rng)
+    al = Alignments(gap_penalty=-2, match_score=2, missmatch_penalty=-1, **options)
+
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call(al, v, w)
+        times.append(time.perf_counter() - start)
+
+    seconds = min(times)
+    cells = len(v) * len(w)
+    return {
+        "method": name,
+        "length": length,
+        "similarity": similarity,
+        "len_v": len(v),
+        "len_w": len(w),
+        "cells": cells,
+        "seconds": seconds,
+        "gcups": cells / seconds / 1e9 if seconds > 0 else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
+
+
+# Every case runs in a fresh process so peak RSS belongs to that case only
+def run(methods, lengths, similarities, seed=0, repeat=3, isolate=True):
+    cases = [
+        (name, length, similarity, seed, repeat)
+        for name in methods
+        for length in lengths
+        for similarity in similarities
+    ]
+    if not isolate:
+        yield from map(run_case, cases)
+        return
+
+    with get_context("spawn").Pool(1, maxtasksperchild=1) as pool:
+        yield from pool.imap(run_case, cases)
+
+
+def report(result):
+    gcups = result["gcups"]
+    print(
+        f"{result['method']:<30} {result['length']:>7} {result['similarity']:>6} "
+        f"{result['seconds']:>10.4f}s "
+        f"{'-' if gcups is None else format(gcups, '.6f'):>10} GCUPS "
+        f"{result['peak_rss_kb']:>9} KB",
+        flush=True,
+    )
+
+
+# Prints old/new speedup of every case the two result files share
+def compare(old_path, new_path):
+    def load(path):
+        with open(path) as f:
+            results = json.load(f)["results"]
+        return dict(((r["method"], r["length"], r["similarity"]), r) for r in results)
+
+    old = load(old_path)
+    new = load(new_path)
+    for key in sorted(old.keys() & new.keys()):
+        speedup = old[key]["seconds"] / new[key]["seconds"]
+        method, length, similarity = key
+        print(f"{method:<30} {length:>7} {similarity:>6} {speedup:>8.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--methods", nargs="+", choices=sorted(BENCHMARKS))
+    parser.add_argument("--lengths", nargs="+", type=int, default=[100, 500, 1000])
+    parser.add_argument(
+        "--similarities", nargs="+", type=float, default=[0.5, 0.9, 0.99]
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-isolate", dest="isolate", action="store_false")
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    methods = args.methods or [
+        name for name in BENCHMARKS if np is not None or name not in NUMPY_BENCHMARKS
+    ]
+    results = []
+    for result in run(
+        methods, args.lengths, args.similarities, args.seed, args.repeat, args.isolate
+    ):
+        report(result)
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "seed": args.seed,
+                    "repeat": args.repeat,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+
+
+import unittest
+from unittest import mock
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_sequence_pair(self):
+        v, w = sequence_pair(100, 1.0, random.Random(0))
+        self.assertEqual(v, w)
+        self.assertEqual(100, len(v))
+
+    def test_run(self):
+        results = list(
+            run(
+                ["needleman_wunsch", "lcs_length"], [20], [0.9], repeat=1, isolate=False
+            )
+        )
+        self.assertEqual(
+            ["needleman_wunsch", "lcs_length"], [r["method"] for r in results]
+        )
+        for result in results:
+            self.assertEqual(result["len_v"] * result["len_w"], result["cells"])
+            self.assertGreater(result["peak_rss_kb"], 0)
+
+    def test_runs_without_numpy(self):
+        methods = [name for name in BENCHMARKS if name not in NUMPY_BENCHMARKS]
+        with mock.patch("alignments.np", None):
+            results = list(run(methods, [20], [0.9], repeat=1, isolate=False))
+        self.assertEqual(methods, [r["method"] for r in results])
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,29 @@
+import gzip
+from array import array
+from bisect import bisect_left
+from collections.abc import Mapping
 from copy import deepcopy
+from os import PathLike
 from random import random
 
+from patterncount import number_to_pattern, rolling_pattern_numbers
+
+try:
+    import numpy as np
+except ImportError:  # PackedDeBruijn falls back to a radix sort
+    np = None
+
 
 class Graph:
     def __init__(self, adjacency_list):
         self.adjacency_list = deepcopy(adjacency_list)
+        # obrnuti indeks: node -> {source: number of edges}, and in-degrees,
+        # kept up to date by add_neighbor, remove_node and bypass
+        self.inbound = {}
+        self.in_degrees = {}
+        for key, neighbors in self.adjacency_list.items():
+            for neighbor in neighbors:
+                self.link(key, neighbor)
 
     def __str__(self):
         return f"{self.adjacency_list}"
@@ -21,21 +40,33 @@ class Graph:
         if node not in self.adjacency_list:
             self.adjacency_list[node] = []
 
+    def link(self, node, neighbor):
+        sources = self.inbound.setdefault(neighbor, {})
+        sources[node] = sources.get(node, 0) + 1
+        self.in_degrees[neighbor] = self.in_degrees.get(neighbor, 0) + 1
+
+    def unlink(self, node, neighbor):
+        sources = self.inbound[neighbor]
+        sources[node] -= 1
+        if sources[node] == 0:
+            del sources[node]
+        self.in_degrees[neighbor] -= 1
+
+    """Only the lists of the node's own sources are filtered"""
+
     def remove_node(self, node):
         if node in self.adjacency_list:
-            del self.adjacency_list[node]
+            for neighbor in self.adjacency_list.pop(node):
+                self.unlink(node, neighbor)
 
-        for key, neighbors in self.adjacency_list.items():
-            self.adjacency_list[key] = [n for n in neighbors if n != node]
+        for key in self.inbound.pop(node, {}):
+            self.adjacency_list[key] = [
+                n for n in self.adjacency_list[key] if n != node
+            ]
+        self.in_degrees.pop(node, None)
 
     def in_degree(self, node):
-        counter = 0
-        for _, nghs in self.adjacency_list.items():
-            for ng in nghs:
-                if ng == node:
-                    counter += 1
-
-        return counter
+        return self.in_degrees.get(node, 0)
 
     def out_degree(self, node):
         return self.num_neighbors(node)
@@ -47,10 +78,8 @@ class Graph:
 
     def inbound_edges(self, node):
         edges = []
-        for key, neighbors in self.adjacency_list.items():
-            for neighbor in neighbors:
-                if neighbor == node:
-                    edges.append((key, node))
+        for key, count in self.inbound.get(node, {}).items():
+            edges += [(key, node)] * count
 
         return edges
 
@@ -61,6 +90,16 @@ class Graph:
 
         return all_edges
 
+    """Compact copy of the graph with integer node ids and CSR edge arrays"""
+
+    def to_csr(self):
+        edges = (
+            (key, neighbor)
+            for key, neighbors in self.adjacency_list.items()
+            for neighbor in neighbors
+        )
+        return CSRGraph(edges, self.adjacency_list)
+
     def get_unvisited_edges(self, node, unvisited_edges):
         node_unvisited_edges = []
         node_edges = self.outbound_edges(node)
@@ -71,46 +110,93 @@ class Graph:
 
         return node_unvisited_edges
 
-    def eulerian_cycle(self):
-        current_node = list(self.adjacency_list.keys())[0]
-        unvisited_edges = self.get_all_edges()
-        unvisited_edges_from_current_node = self.get_unvisited_edges(
-            current_node, unvisited_edges
-        )
-        cycle = [current_node]
+    """Hierholzer's algorithm: every node keeps a pointer to its next unused
+    outbound edge, so each edge is walked once and the walk is spliced
+    together on an explicit stack in O(V + E)"""
 
-        while len(unvisited_edges) > 0:
-            while len(unvisited_edges_from_current_node) > 0:
-                current_edge = unvisited_edges_from_current_node[0]
-                (from_node, to_node) = current_edge
+    def eulerian_walk(self, start):
+        next_edge = dict.fromkeys(self.adjacency_list, 0)
+        num_edges = sum(len(neighbors) for neighbors in self.adjacency_list.values())
+        stack = [start]
+        walk = []
 
-                unvisited_edges.remove(current_edge)
+        while len(stack) > 0:
+            node = stack[-1]
+            neighbors = self.adjacency_list.get(node, [])
+            i = next_edge.get(node, 0)
+            if i < len(neighbors):
+                next_edge[node] = i + 1
+                stack.append(neighbors[i])
+            else:
+                walk.append(stack.pop())
 
-                cycle.append(to_node)
+        if len(walk) != num_edges + 1:
+            raise ValueError("Graph has no Eulerian walk from " + str(start))
 
-                current_node = to_node
-                unvisited_edges_from_current_node = self.get_unvisited_edges(
-                    current_node, unvisited_edges
-                )
+        walk.reverse()
+        return walk
 
-            for i in range(len(cycle)):
-                current_node = cycle[i]
-                unvisited_edges_from_current_node = self.get_unvisited_edges(
-                    current_node, unvisited_edges
-                )
-                if len(unvisited_edges_from_current_node) > 0:
-                    cycle = cycle[i:] + cycle[1 : i + 1]
+    """Out-degree minus in-degree of every node where they differ"""
+
+    def degree_differences(self):
+        differences = {}
+        for node in self.adjacency_list:
+            difference = self.out_degree(node) - self.in_degree(node)
+            if difference != 0:
+                differences[node] = difference
+
+        # cvorovi koji nisu kljucevi imaju samo ulazne grane
+        for node, degree in self.in_degrees.items():
+            if node not in self.adjacency_list and degree > 0:
+                differences[node] = -degree
+
+        return differences
+
+    """First node with an outbound edge, isolated nodes are not on any walk"""
+
+    def first_with_edges(self):
+        for node in self.adjacency_list:
+            if self.out_degree(node) > 0:
+                return node
+        return next(iter(self.adjacency_list))
+
+    def eulerian_cycle(self):
+        if len(self.adjacency_list) == 0:
+            return []
+        if len(self.degree_differences()) > 0:
+            raise ValueError("Graph has no Eulerian cycle: unbalanced nodes")
+        return self.eulerian_walk(self.first_with_edges())
+
+    """Eulerian path starts at the node with one more outbound than inbound
+    edge, or at any node with edges if the graph is balanced. At most that
+    node and one with one more inbound edge may be unbalanced."""
+
+    def eulerian_path(self):
+        if len(self.adjacency_list) == 0:
+            return []
+
+        differences = self.degree_differences()
+        if sorted(differences.values()) not in ([], [-1, 1]):
+            raise ValueError("Graph has no Eulerian path: unbalanced nodes")
+
+        start = self.first_with_edges()
+        for node, difference in differences.items():
+            if difference == 1:
+                start = node
 
-        return cycle
+        return self.eulerian_walk(start)
 
     def add_neighbor(self, node, neighbor):
         self.adjacency_list[node].append(neighbor)
+        self.link(node, neighbor)
 
     def bypass(self, u, v, w):
         x = f"{v}-{random()}"
 
         self.adjacency_list[u].remove(v)
+        self.unlink(u, v)
         self.adjacency_list[v].remove(w)
+        self.unlink(v, w)
         self.add_node(x)
 
         self.add_neighbor(u, x)
@@ -190,7 +276,7 @@ class Graph:
                 for v, w in outbound_e:
                     if u == v and u == w:
                         continue  # grana koja ide u isti cvor, preskacemo.
-                    new_graph = Graph(deepcopy(non_simple_g.adjacency_list))
+                    new_graph = Graph(dict(non_simple_g.adjacency_list))
                     new_graph.bypass(u, v, w)
 
                     if new_graph.is_connected():
@@ -234,40 +320,253 @@ class Graph:
 
                         paths.append(non_branching_path)
 
+        # preostali 1-in-1-out cvorovi leze na izolovanim ciklusima
         for v in self.adjacency_list:
-            if v not in visited:
+            if v not in visited and self.in_degree(v) == 1 and self.out_degree(v) == 1:
                 visited.add(v)
 
                 non_branching_path = [v]
-                neighbor = self.outbound_edges(v)
-                while neighbor != None and neighbor[1] not in visited:
-                    w = neighbor[1]
+                [(_, w)] = self.outbound_edges(v)
+                while w not in visited:
                     non_branching_path.append(w)
                     visited.add(w)
-                    neighbor = self.outbound_edges(w)
+                    [(_, w)] = self.outbound_edges(w)
+                non_branching_path.append(w)
 
                 paths.append(non_branching_path)
 
         return paths
 
 
-class DeBruijn(Graph):
-    def __init__(self, reads, k):
-        kmers = self.get_kmers(reads, k)  # array of triples
-        adjacency_list = {}
+class CSRAdjacency(Mapping):
+    """Read-only adjacency list view of a CSRGraph"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, node):
+        return self.graph.get_neighbors(node)
+
+    def __iter__(self):
+        return iter(self.graph.nodes)
+
+    def __len__(self):
+        return len(self.graph.nodes)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+"""Immutable graph in compressed sparse row form: nodes are interned to ids
+0..V-1 and the neighbors of node i are targets[offsets[i]:offsets[i + 1]].
+Edges are given as (node, neighbor) pairs, nodes without edges can be
+listed in nodes."""
+
+
+class CSRGraph(Graph):
+    def __init__(self, edges, nodes=()):
+        self.nodes = []  # id -> node
+        self.ids = {}  # node -> id
+        for node in nodes:
+            self.intern(node)
+
+        sources = array("I")
+        targets = array("I")
+        for node, neighbor in edges:
+            sources.append(self.intern(node))
+            targets.append(self.intern(neighbor))
+
+        self.build(sources, targets)
+
+    def intern(self, node):
+        i = self.ids.get(node)
+        if i is None:
+            i = self.ids[node] = len(self.nodes)
+            self.nodes.append(node)
+        return i
+
+    def node_id(self, node):
+        return self.ids[node]
+
+    # counting sort of the edges by source, stable so neighbors keep their order
+    def build(self, sources, targets):
+        n = len(self.nodes)
+        self.offsets = array("Q", bytes(8 * (n + 1)))
+        self.in_degrees = array("I", bytes(4 * n))
+        for u in sources:
+            self.offsets[u + 1] += 1
+        for v in targets:
+            self.in_degrees[v] += 1
+        for i in range(n):
+            self.offsets[i + 1] += self.offsets[i]
+
+        position = self.offsets[:-1]
+        self.targets = array("I", bytes(4 * len(targets)))
+        for u, v in zip(sources, targets):
+            self.targets[position[u]] = v
+            position[u] += 1
+
+        self.reverse_offsets = None
+        self.sources = None
+        self.adjacency_list = CSRAdjacency(self)
+
+    # inbound edges in the same layout, built on first use
+    def reverse(self):
+        if self.reverse_offsets is None:
+            n = len(self.nodes)
+            self.reverse_offsets = array("Q", bytes(8 * (n + 1)))
+            for i in range(n):
+                self.reverse_offsets[i + 1] = (
+                    self.reverse_offsets[i] + self.in_degrees[i]
+                )
+
+            position = self.reverse_offsets[:-1]
+            self.sources = array("I", bytes(4 * len(self.targets)))
+            for u in range(n):
+                for v in self.targets[self.offsets[u] : self.offsets[u + 1]]:
+                    self.sources[position[v]] = u
+                    position[v] += 1
+
+        return self.reverse_offsets, self.sources
+
+    def to_graph(self):
+        return Graph(dict(self.adjacency_list.items()))
+
+    def get_neighbors(self, node):
+        i = self.node_id(node)
+        return [
+            self.nodes[v] for v in self.targets[self.offsets[i] : self.offsets[i + 1]]
+        ]
+
+    def num_neighbors(self, node):
+        i = self.node_id(node)
+        return self.offsets[i + 1] - self.offsets[i]
+
+    def in_degree(self, node):
+        return self.in_degrees[self.node_id(node)]
+
+    def inbound_edges(self, node):
+        reverse_offsets, sources = self.reverse()
+        i = self.node_id(node)
+        return [
+            (self.nodes[u], node)
+            for u in sources[reverse_offsets[i] : reverse_offsets[i + 1]]
+        ]
+
+    def degree_differences(self):
+        differences = {}
+        for u, node in enumerate(self.nodes):
+            difference = self.offsets[u + 1] - self.offsets[u] - self.in_degrees[u]
+            if difference != 0:
+                differences[node] = difference
+        return differences
+
+    def eulerian_walk(self, start):
+        offsets = self.offsets
+        targets = self.targets
+        next_edge = offsets[:-1]
+        stack = array("I", [self.node_id(start)])
+        walk = array("I")
+
+        while len(stack) > 0:
+            u = stack[-1]
+            i = next_edge[u]
+            if i < offsets[u + 1]:
+                next_edge[u] = i + 1
+                stack.append(targets[i])
+            else:
+                walk.append(stack.pop())
+
+        if len(walk) != len(targets) + 1:
+            raise ValueError("Graph has no Eulerian walk from " + str(start))
+
+        walk.reverse()
+        return [self.nodes[u] for u in walk]
+
+    def add_node(self, node):
+        raise TypeError("CSRGraph is immutable, edit the Graph from to_graph()")
+
+    def remove_node(self, node):
+        raise TypeError("CSRGraph is immutable, edit the Graph from to_graph()")
+
+    def add_neighbor(self, node, neighbor):
+        raise TypeError("CSRGraph is immutable, edit the Graph from to_graph()")
+
+    def bypass(self, u, v, w):
+        raise TypeError("CSRGraph is immutable, edit the Graph from to_graph()")
+
+
+"""Opens a plain or gzip compressed text file, recognized by the gzip magic bytes"""
+
+
+def open_text(path):
+    with open(path, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    return gzip.open(path, "rt") if gzipped else open(path)
+
+
+"""Yields the sequences of a FASTA or FASTQ file one record at a time. FASTA
+records longer than chunk_size symbols come in chunks cut at line ends, each
+repeating the last overlap symbols of the previous one, so no k-mer with
+k <= overlap + 1 is lost at a chunk boundary."""
+
 
-        for kmer in kmers:
-            u = kmer[:-1]
-            v = kmer[1:]
-            if u not in adjacency_list:
-                adjacency_list[u] = []
+def read_sequences(path, overlap=0, chunk_size=1 << 20):
+    with open_text(path) as f:
+        pieces = []
+        size = 0
+        fresh = False
+        for line in f:
+            if line.startswith("@"):  # FASTQ: header, sequence, +, qualities
+                yield next(f).strip()
+                next(f)
+                next(f)
+            elif line.startswith(">"):
+                if fresh:
+                    yield "".join(pieces)
+                pieces = []
+                size = 0
+                fresh = False
+            else:
+                line = line.strip()
+                pieces.append(line)
+                size += len(line)
+                fresh = fresh or len(line) > 0
+                if size >= chunk_size:
+                    chunk = "".join(pieces)
+                    yield chunk
+                    tail = chunk[-overlap:] if overlap > 0 else ""
+                    pieces = [tail]
+                    size = len(tail)
+                    fresh = False
 
-            if v not in adjacency_list:
-                adjacency_list[v] = []
+        if fresh:
+            yield "".join(pieces)
 
-            adjacency_list[u].append(v)
 
-        super().__init__(adjacency_list)
+"""Reads are an iterable of strings or the path of a FASTA/FASTQ file"""
+
+
+def read_stream(reads, k):
+    if isinstance(reads, (str, PathLike)):
+        return read_sequences(reads, overlap=k - 1)
+    return reads
+
+
+def de_bruijn_edges(reads, k):
+    for read in read_stream(reads, k):
+        for i in range(len(read) - k + 1):
+            yield read[i : i + k - 1], read[i + 1 : i + k]
+
+
+class DeBruijn(Graph):
+    def __init__(self, reads, k):
+        super().__init__({})
+
+        for u, v in de_bruijn_edges(reads, k):
+            self.add_node(u)
+            self.add_node(v)
+            self.add_neighbor(u, v)
 
     def get_kmers(self, reads, k):
         kmers = []
@@ -279,7 +578,105 @@ class DeBruijn(Graph):
         return kmers
 
 
+class CSRDeBruijn(CSRGraph):
+    def __init__(self, reads, k):
+        super().__init__(de_bruijn_edges(reads, k))
+
+
+"""Sorted distinct values of an array("Q") of bits-bit integers, without a
+Python object per value: np.unique, or without numpy an LSD radix sort on
+16-bit digits between two array buffers followed by one deduplicating pass"""
+
+
+def sort_unique(values, bits=64):
+    if np is not None:
+        return array("Q", np.unique(np.frombuffer(values, dtype=np.uint64)).tobytes())
+    return radix_sort_unique(values, bits)
+
+
+def radix_sort_unique(values, bits=64):
+    values = array("Q", values)
+    buffer = array("Q", bytes(8 * len(values)))
+    for shift in range(0, bits, 16):
+        starts = [0] * 65537
+        for value in values:
+            starts[((value >> shift) & 0xFFFF) + 1] += 1
+        for digit in range(65536):
+            starts[digit + 1] += starts[digit]
+
+        for value in values:
+            digit = (value >> shift) & 0xFFFF
+            buffer[starts[digit]] = value
+            starts[digit] += 1
+        values, buffer = buffer, values
+
+    unique = array("Q")
+    for i, value in enumerate(values):
+        if i == 0 or value != values[i - 1]:
+            unique.append(value)
+    return unique
+
+
+"""De Bruijn graph of (k-1)-mers packed 2 bits per base with the encoding of
+patterncount.pattern_to_number. Every read is a single rolling pass without
+substrings, k-mers with symbols other than A, T, C, G are skipped. Nodes are
+the packed integers in a sorted array, ids are found by binary search, and
+label/labels turn nodes back into strings."""
+
+
+class PackedDeBruijn(CSRGraph):
+    def __init__(self, reads, k):
+        if k > 33:
+            raise ValueError("(k-1)-mers longer than 32 do not fit in 64 bits")
+        self.k = k
+        mask = 4 ** (k - 1) - 1
+
+        sources = array("Q")
+        targets = array("Q")
+        for read in read_stream(reads, k):
+            for _, number in rolling_pattern_numbers(read, k):
+                sources.append(number >> 2)
+                targets.append(number & mask)
+
+        self.nodes = sort_unique(sources + targets, 2 * (k - 1))
+        if np is not None:
+            nodes = np.frombuffer(self.nodes, dtype=np.uint64)
+            ids = np.searchsorted(nodes, np.frombuffer(sources, dtype=np.uint64))
+            sources = array("I", ids.astype(np.uint32).tobytes())
+            ids = np.searchsorted(nodes, np.frombuffer(targets, dtype=np.uint64))
+            targets = array("I", ids.astype(np.uint32).tobytes())
+        else:
+            sources = array("I", map(self.node_id, sources))
+            targets = array("I", map(self.node_id, targets))
+        self.build(sources, targets)
+
+    def __str__(self):
+        return str(
+            dict(
+                (self.label(node), self.labels(neighbors))
+                for node, neighbors in self.adjacency_list.items()
+            )
+        )
+
+    def node_id(self, node):
+        i = bisect_left(self.nodes, node)
+        if i == len(self.nodes) or self.nodes[i] != node:
+            raise KeyError(node)
+        return i
+
+    def label(self, node):
+        return number_to_pattern(node, self.k - 1)
+
+    def labels(self, nodes):
+        return [self.label(node) for node in nodes]
+
+
+import os
+import tempfile
 import unittest
+from random import Random
+
+from patterncount import pattern_to_number
 
 
 class TestDeBruijn(unittest.TestCase):
@@ -300,10 +697,179 @@ class TestDeBruijn(unittest.TestCase):
         g = Graph(self.make_graph())
 
         self.assertEqual(
-            ["E", "G", "D", "A", "B", "C", "D", "B", "E", "F", "G", "E"],
+            ["A", "B", "C", "D", "B", "E", "G", "E", "F", "G", "D", "A"],
             g.eulerian_cycle(),
         )
 
+    def assert_eulerian_walk(self, g, walk):
+        self.assertEqual(sorted(g.get_all_edges()), sorted(zip(walk[:-1], walk[1:])))
+
+    def test_eulerian_path(self):
+        reads = ["TAATGCCATGGGATGTT"]
+        dg = DeBruijn(reads, k=3)
+        path = dg.eulerian_path()
+        self.assertEqual("TA", path[0])
+        self.assertEqual("TT", path[-1])
+        self.assert_eulerian_walk(dg, path)
+
+        dg.close_to_cycle()
+        cycle = dg.eulerian_cycle()
+        self.assertEqual(cycle[0], cycle[-1])
+        self.assert_eulerian_walk(dg, cycle)
+
+    def test_eulerian_cycle_long(self):
+        # ciklus 0 -> 1 -> ... -> n - 1 -> 0 i tetive i -> i + 2, u oba smera
+        n = 50000
+        G = dict((i, [(i + 1) % n, (i + 2) % n]) for i in range(n))
+        for i in range(n):
+            G[(i + 2) % n].append(i)
+            G[(i + 1) % n].append(i)
+        g = Graph(G)
+        cycle = g.eulerian_cycle()
+        self.assertEqual(4 * n + 1, len(cycle))
+        self.assert_eulerian_walk(g, cycle)
+
+    def test_no_eulerian_cycle(self):
+        g = Graph({"A": ["B"], "B": []})
+        self.assertEqual(["A", "B"], g.eulerian_path())
+        with self.assertRaises(ValueError):
+            Graph({"A": ["B"], "B": [], "C": ["A"]}).eulerian_cycle()
+
+        for adjacency_list, method in [
+            ({"A": ["B"], "B": []}, "eulerian_cycle"),
+            ({"A": ["B"], "B": ["A", "C"], "C": []}, "eulerian_cycle"),
+            ({"A": ["B", "C"]}, "eulerian_path"),
+            ({"A": ["B", "C"], "B": [], "C": []}, "eulerian_path"),
+            ({"A": ["B"], "C": ["D"]}, "eulerian_path"),
+        ]:
+            g = Graph(adjacency_list)
+            with self.assertRaises(ValueError):
+                getattr(g, method)()
+            with self.assertRaises(ValueError):
+                getattr(g.to_csr(), method)()
+
+        # izolovani cvorovi ne smetaju
+        g = Graph({"X": [], "A": ["B"], "B": ["A"]})
+        self.assertEqual(["A", "B", "A"], g.eulerian_cycle())
+        self.assertEqual(["A", "B", "A"], g.eulerian_path())
+        self.assertEqual(["A", "B", "A"], g.to_csr().eulerian_cycle())
+        self.assertEqual(["X"], Graph({"X": []}).eulerian_cycle())
+
+    def test_csr_graph(self):
+        g = Graph(self.make_graph())
+        csr = g.to_csr()
+        self.assertEqual(str(g), str(csr))
+        self.assertEqual(g.get_all_edges(), csr.get_all_edges())
+        for node in g.adjacency_list:
+            self.assertEqual(g.get_neighbors(node), csr.get_neighbors(node))
+            self.assertEqual(g.out_degree(node), csr.out_degree(node))
+            self.assertEqual(g.in_degree(node), csr.in_degree(node))
+            self.assertEqual(g.outbound_edges(node), csr.outbound_edges(node))
+            self.assertEqual(g.inbound_edges(node), csr.inbound_edges(node))
+        self.assertEqual(g.eulerian_cycle(), csr.eulerian_cycle())
+        self.assertEqual(g.is_connected(), csr.is_connected())
+        self.assertEqual(
+            sorted(g.all_eulerian_cycles()), sorted(csr.all_eulerian_cycles())
+        )
+        self.assertEqual(str(g), str(csr.to_graph()))
+        with self.assertRaises(TypeError):
+            csr.add_neighbor("A", "C")
+
+    def test_csr_de_bruijn(self):
+        reads = ["TAATGCCATGGGATGTT", "GGATGA"]
+        dg = DeBruijn(reads, k=3)
+        csr = CSRDeBruijn(reads, k=3)
+        self.assertEqual(str(dg), str(csr))
+        self.assertEqual(dg.get_unbalanced(), csr.get_unbalanced())
+
+        dg = DeBruijn(reads[:1], k=3)
+        csr = CSRDeBruijn(reads[:1], k=3)
+        self.assertEqual(dg.eulerian_path(), csr.eulerian_path())
+
+    def test_packed_de_bruijn(self):
+        reads = ["TAATGCCATGGGATGTT", "GGATGA"]
+        dg = DeBruijn(reads, k=3)
+        packed = PackedDeBruijn(reads, k=3)
+        self.assertEqual(
+            dict(dg.adjacency_list),
+            dict(
+                (packed.label(node), packed.labels(neighbors))
+                for node, neighbors in packed.adjacency_list.items()
+            ),
+        )
+
+        dg = DeBruijn(reads[:1], k=3)
+        packed = PackedDeBruijn(reads[:1], k=3)
+        self.assertEqual(dg.eulerian_path(), packed.labels(packed.eulerian_path()))
+        self.assertEqual(packed.in_degree(pattern_to_number("TG")), 3)
+        with self.assertRaises(KeyError):
+            packed.get_neighbors(pattern_to_number("CC") + 100)
+
+    def test_sort_unique(self):
+        rng = Random(24)
+        values = array("Q", [rng.randrange(4**30) for _ in range(500)])
+        values += values[:100]
+        expected = array("Q", sorted(set(values)))
+        self.assertEqual(expected, sort_unique(values, 60))
+        self.assertEqual(expected, radix_sort_unique(values, 60))
+        self.assertEqual(array("Q"), radix_sort_unique(array("Q")))
+
+    def test_packed_de_bruijn_skips_unknown_symbols(self):
+        packed = PackedDeBruijn(["AATNGG", "CAAT"], k=3)
+        self.assertEqual("{'AA': ['AT', 'AT'], 'AT': [], 'CA': ['AA']}", str(packed))
+
+    def write_reads(self, directory, name, text):
+        path = os.path.join(directory, name)
+        opener = gzip.open if name.endswith(".gz") else open
+        with opener(path, "wt") as f:
+            f.write(text)
+        return path
+
+    def test_read_sequences(self):
+        with tempfile.TemporaryDirectory() as directory:
+            fasta = self.write_reads(
+                directory, "reads.fa", ">r1\nTAATGCC\nATGGGATGTT\n>r2\n\n>r3\nGGATGA\n"
+            )
+            fastq = self.write_reads(
+                directory,
+                "reads.fq.gz",
+                "@r1\nTAATGCCATGGGATGTT\n+\nIIIIIIIIIIIIIIIII\n@r3\nGGATGA\n+\nIIIIII\n",
+            )
+            reads = ["TAATGCCATGGGATGTT", "GGATGA"]
+            self.assertEqual(reads, list(read_sequences(fasta)))
+            self.assertEqual(reads, list(read_sequences(fastq)))
+            self.assertEqual(
+                ["TAATGCC", "GCCATGGGATGTT", "GGATGA"],
+                list(read_sequences(fasta, overlap=3, chunk_size=5)),
+            )
+            # chunks shorter than the overlap keep all of their symbols
+            self.assertEqual(
+                ["TAATGCC", "TAATGCCATGGGATGTT", "GGATGA"],
+                list(read_sequences(fasta, overlap=10, chunk_size=5)),
+            )
+
+            expected = str(DeBruijn(reads, k=4))
+            for path in (fasta, fastq):
+                self.assertEqual(expected, str(DeBruijn(path, k=4)))
+                self.assertEqual(expected, str(CSRDeBruijn(path, k=4)))
+            self.assertEqual(
+                str(PackedDeBruijn(reads, k=4)), str(PackedDeBruijn(fastq, k=4))
+            )
+
+    def test_streamed_chunks_keep_kmers(self):
+        genome = "TAATGCCATGGGATGTTAGCATTGACCAGTAACG"
+        with tempfile.TemporaryDirectory() as directory:
+            lines = [genome[i : i + 6] for i in range(0, len(genome), 6)]
+            path = self.write_reads(
+                directory, "genome.fa.gz", ">g\n" + "\n".join(lines)
+            )
+            chunks = list(read_sequences(path, overlap=4, chunk_size=10))
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual(
+                DeBruijn([genome], k=5).adjacency_list,
+                DeBruijn(chunks, k=5).adjacency_list,
+            )
+
     def test_de_bruijn_cycles(self):
         reads = ["TAATGCCATGGGATGTT"]
         dg = DeBruijn(reads, k=3)
@@ -334,6 +900,28 @@ class TestDeBruijn(unittest.TestCase):
         g = Graph(self.make_graph())
         self.assertEqual(2, g.in_degree("B"))
 
+    def test_degrees_after_edits(self):
+        g = Graph(self.make_graph())
+        g.add_node("X")
+        g.add_neighbor("X", "B")
+        g.add_neighbor("B", "B")
+        g.bypass("D", "B", "C")
+        g.remove_node("E")
+        expected = Graph(g.adjacency_list)
+        for node in g.adjacency_list:
+            self.assertEqual(expected.in_degree(node), g.in_degree(node))
+            self.assertEqual(
+                sorted(expected.inbound_edges(node)), sorted(g.inbound_edges(node))
+            )
+        self.assertEqual(0, g.in_degree("E"))
+        self.assertEqual(3, g.in_degree("B"))
+
+    def test_maximal_non_branching_paths(self):
+        g = Graph({1: [2], 2: [3], 3: [4, 5], 4: [], 5: [], 6: [7], 7: [6]})
+        self.assertEqual(
+            [[1, 2, 3], [3, 4], [3, 5], [6, 7, 6]], g.maximal_non_branching_paths()
+        )
+
     def test_debrujin(self):
         reads = ["AATT"]
         dg = DeBruijn(reads=reads, k=3)
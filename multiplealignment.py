@@ -0,0 +1,196 @@
+from alignments import DIAG, LEFT, UP, Alignments
+from philogenetictree import Phylogeny
+
+try:
+    import numpy as np
+except ImportError:  # progressive alignment needs numpy
+    np = None
+
+GAP = "-"
+
+
+# Progresivno poravnanje: pairwise edit distances (on a process pool with
+# workers > 1) give a UPGMA or neighbor joining guide tree, and the profiles
+# of the sequences are aligned to each other along it. Substitution scores
+# and the gap penalty come from the Alignments instance.
+class ProgressiveAlignment:
+    def __init__(self, alignments=None, tree="upgma", workers=1):
+        if np is None:
+            raise ImportError("progressive alignment requires numpy to be installed")
+        self.alignments = alignments if alignments is not None else Alignments()
+        self.tree = tree
+        self.workers = workers
+
+    # Edit distances divided by the length of the longer sequence
+    def distances(self, sequences):
+        n = len(sequences)
+        D = np.zeros((n, n))
+        pairs = self.alignments.all_vs_all(sequences, "distance", self.workers)
+        for (i, j), distance in pairs:
+            length = max(len(sequences[i]), len(sequences[j]), 1)
+            D[i, j] = D[j, i] = distance / length
+        return D
+
+    # Substitution scores of every pair of symbols, gap included as the last
+    # symbol: a gap against a residue costs the gap penalty, against a gap 0
+    def scoring(self, alphabet):
+        table, codes, _ = self.alignments.scoring_table(alphabet, "")
+        size = len(alphabet) + 1
+        scores = np.full((size, size), float(self.alignments.GAP_PENALTY))
+        codes = list(codes)
+        scores[:-1, :-1] = np.array(table, dtype=np.float64)[np.ix_(codes, codes)]
+        scores[-1, -1] = 0
+        return scores
+
+    # Symbol frequencies of every column of an aligned block of codes
+    def profile(self, block, size):
+        counts = np.zeros((block.shape[1], size))
+        for code in range(size):
+            counts[:, code] = (block == code).sum(axis=0)
+        return counts / len(block)
+
+    # Aligns two profiles with the row-at-a-time numpy recurrence of
+    # Alignments.fill_numpy. Every pair of columns scores the expected
+    # substitution score, and a gap column the expected gap penalty.
+    # Returns the traceback moves from the start.
+    def align_profiles(self, p, q, scores):
+        n = len(p) + 1
+        m = len(q) + 1
+        match_scores = p @ scores @ q.T
+        p_gaps = p @ scores[:, -1]
+        q_gaps = q @ scores[:, -1]
+
+        offsets = np.concatenate(([0.0], np.cumsum(q_gaps)))
+        prev = offsets.copy()
+        row = np.empty(m)
+        directions = np.empty((n, m), dtype=np.uint8)
+        directions[0, :] = LEFT
+        directions[:, 0] = UP
+
+        for i in range(1, n):
+            from_diag = prev[:-1] + match_scores[i - 1]
+            from_up = prev[1:] + p_gaps[i - 1]
+
+            row[0] = prev[0] + p_gaps[i - 1]
+            np.maximum(from_diag, from_up, out=row[1:])
+            shifted = row - offsets
+            best = np.maximum.accumulate(shifted)
+            from_left = shifted[1:] < best[1:]
+
+            direction = directions[i, 1:]
+            direction[:] = np.where(from_diag >= from_up, DIAG, UP)
+            direction[from_left] = LEFT
+            row[1:] = np.where(from_left, best[1:] + offsets[1:], row[1:])
+
+            prev, row = row, prev
+
+        moves = []
+        i = n - 1
+        j = m - 1
+        while i > 0 or j > 0:
+            direction = directions[i, j]
+            moves.append(direction)
+            if direction != LEFT:
+                i -= 1
+            if direction != UP:
+                j -= 1
+        moves.reverse()
+        return moves
+
+    # Inserts the gap columns of the moves into both blocks and stacks them
+    def merge(self, p_block, q_block, moves, gap):
+        moves = np.array(moves, dtype=np.uint8)
+        p_columns = np.flatnonzero(moves != LEFT)
+        q_columns = np.flatnonzero(moves != UP)
+
+        block = np.full((len(p_block) + len(q_block), len(moves)), gap, np.uint8)
+        block[: len(p_block), p_columns] = p_block
+        block[len(p_block) :, q_columns] = q_block
+        return block
+
+    # Returns the aligned sequences in input order, gaps as "-"
+    def align(self, sequences):
+        sequences = list(sequences)
+        if len(sequences) < 2:
+            return sequences
+
+        alphabet = "".join(sorted(set("".join(sequences))))
+        index = dict((symbol, code) for code, symbol in enumerate(alphabet))
+        gap = len(alphabet)
+        size = gap + 1
+        scores = self.scoring(alphabet)
+
+        merges = Phylogeny().guide_tree(self.distances(sequences), self.tree)
+
+        # node -> (sequence indices, aligned block of codes)
+        nodes = {}
+        for i, sequence in enumerate(sequences):
+            codes = np.array([index[symbol] for symbol in sequence], dtype=np.uint8)
+            nodes[i] = ([i], codes.reshape(1, len(sequence)))
+
+        for k, (a, b) in enumerate(merges):
+            a_indices, a_block = nodes.pop(a)
+            b_indices, b_block = nodes.pop(b)
+            moves = self.align_profiles(
+                self.profile(a_block, size), self.profile(b_block, size), scores
+            )
+            block = self.merge(a_block, b_block, moves, gap)
+            nodes[len(sequences) + k] = (a_indices + b_indices, block)
+
+        ((indices, block),) = nodes.values()
+        symbols = np.array(list(alphabet + GAP))
+        aligned = [None] * len(sequences)
+        for i, codes in zip(indices, block):
+            aligned[i] = "".join(symbols[codes])
+        return aligned
+
+
+import random
+import unittest
+
+
+@unittest.skipIf(np is None, "numpy is not installed")
+class TestProgressiveAlignment(unittest.TestCase):
+    def test_align(self):
+        msa = ProgressiveAlignment(Alignments(-2, 2, -1))
+        aligned = msa.align(["ACGTACGT", "ACGACGT", "ACGTACG", "AGTACGT"])
+        self.assertEqual(1, len(set(map(len, aligned))))
+        self.assertEqual(
+            ["ACGTACGT", "ACGACGT", "ACGTACG", "AGTACGT"],
+            [row.replace(GAP, "") for row in aligned],
+        )
+        self.assertEqual("ACG-ACGT", aligned[1])
+
+    def test_identical_sequences(self):
+        msa = ProgressiveAlignment()
+        self.assertEqual(["ACGT"] * 3, msa.align(["ACGT"] * 3))
+        self.assertEqual(["ACGT"], msa.align(["ACGT"]))
+
+    def test_two_sequences_score_like_needleman_wunsch(self):
+        rng = random.Random(18)
+        al = Alignments(-2, 2, -1)
+        msa = ProgressiveAlignment(al)
+        for _ in range(10):
+            v = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 20)))
+            w = "".join(rng.choice("ACGT") for _ in range(rng.randint(1, 20)))
+            v_align, w_align = msa.align([v, w])
+            score = 0
+            for x, y in zip(v_align, w_align):
+                if x == GAP or y == GAP:
+                    score += al.GAP_PENALTY
+                else:
+                    score += al.MATCH_SCORE if x == y else al.MISSMATCH_PENALTY
+            self.assertEqual(al.needleman_wunsch(v, w)[0], score)
+
+    def test_workers(self):
+        rng = random.Random(19)
+        sequences = ["".join(rng.choice("ACGT") for _ in range(30)) for _ in range(6)]
+        msa = ProgressiveAlignment(tree="neighbor_joining")
+        self.assertEqual(
+            msa.align(sequences),
+            ProgressiveAlignment(tree="neighbor_joining", workers=2).align(sequences),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
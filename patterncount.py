@@ -50,6 +50,24 @@ def pattern_to_number(pattern):
     return pattern_to_number(prefix) * 4 + symbol_to_number(last_symbol)
 
 
+# pattern_to_number of every k-mer of text, updated in O(1) per symbol by
+# shifting in 2 bits. k-mers with symbols outside of mapping are skipped.
+def rolling_pattern_numbers(text, k):
+    mask = 4**k - 1
+    number = 0
+    valid = 0
+    for i, symbol in enumerate(text):
+        if symbol not in mapping:
+            number = 0
+            valid = 0
+            continue
+
+        number = ((number << 2) | mapping[symbol]) & mask
+        valid += 1
+        if valid >= k:
+            yield i - k + 1, number
+
+
 def number_to_symbol(number):
     if number not in inv_map:
         raise "Invalid Number"
@@ -225,6 +243,15 @@ class PatternCount(unittest.TestCase):
     def test_pattern_to_number(self):
         self.assertEqual(6, pattern_to_number("ATC"))
 
+    def test_rolling_pattern_numbers(self):
+        text = "ATCGNGCATT"
+        expected = [
+            (i, pattern_to_number(text[i : i + 3]))
+            for i in range(len(text) - 2)
+            if "N" not in text[i : i + 3]
+        ]
+        self.assertEqual(expected, list(rolling_pattern_numbers(text, 3)))
+
     def test_number_to_pattern(self):
         self.assertEqual("ATC", number_to_pattern(6, 3))
 
@@ -1,3 +1,9 @@
+try:
+    import numpy as np
+except ImportError:  # guide_tree needs numpy
+    np = None
+
+
 class Graph:
     def __init__(self, adjacency_list):
         self.adjacency_list = adjacency_list
@@ -278,6 +284,50 @@ class Phylogeny:
 
         return T
 
+    # Merge order of UPGMA or neighbor joining on a distance matrix, for use
+    # as a guide tree: leaves are 0..n-1 and the k-th merge creates node
+    # n + k. The distances live in one numpy matrix that is updated in place,
+    # so each merge costs O(n^2) vectorized work.
+    def guide_tree(self, D, method="upgma"):
+        if np is None:
+            raise ImportError("guide_tree requires numpy to be installed")
+        if method not in ("upgma", "neighbor_joining"):
+            raise ValueError(f"Unknown method: {method}")
+
+        D = np.array(D, dtype=np.float64)
+        n = len(D)
+        nodes = list(range(n))
+        sizes = np.ones(n)
+        active = np.ones(n, dtype=bool)
+        merges = []
+
+        for k in range(n - 1):
+            r = n - k
+            if method == "upgma" or r == 2:
+                Q = D.copy()
+            else:
+                total = D[:, active].sum(axis=1)
+                Q = (r - 2) * D - total[:, None] - total[None, :]
+            Q[~active, :] = np.inf
+            Q[:, ~active] = np.inf
+            np.fill_diagonal(Q, np.inf)
+            i, j = divmod(int(np.argmin(Q)), n)
+
+            if method == "upgma":
+                row = (sizes[i] * D[i] + sizes[j] * D[j]) / (sizes[i] + sizes[j])
+            else:
+                row = 0.5 * (D[i] + D[j] - D[i, j])
+            D[i, :] = row
+            D[:, i] = row
+            D[i, i] = 0
+            sizes[i] += sizes[j]
+            active[j] = False
+
+            merges.append((nodes[i], nodes[j]))
+            nodes[i] = n + k
+
+        return merges
+
 
 import unittest
 
@@ -328,6 +378,21 @@ class TestPhylogeny(unittest.TestCase):
         print("Neighbor joining: ")
         print(ph.neighbor_joining(d_map, n))
 
+    @unittest.skipIf(np is None, "numpy is not installed")
+    def test_guide_tree(self):
+        ph = Phylogeny()
+        D = [[0, 3, 4, 3], [3, 0, 4, 5], [4, 4, 0, 2], [3, 5, 2, 0]]
+        self.assertEqual([(2, 3), (0, 1), (5, 4)], ph.guide_tree(D))
+
+        D = [[0, 13, 21, 22], [13, 0, 12, 13], [21, 12, 0, 13], [22, 13, 13, 0]]
+        merges = ph.guide_tree(D, "neighbor_joining")
+        self.assertEqual(3, len(merges))
+        self.assertEqual(
+            {0, 1, 2, 3, 4, 5}, {node for merge in merges for node in merge}
+        )
+        with self.assertRaises(ValueError):
+            ph.guide_tree(D, "wpgma")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,169 @@
+import os
+import unittest
+
+BLOSUM62 = """
+   A  R  N  D  C  Q  E  G  H  I  L  K  M  F  P  S  T  W  Y  V  B  Z  X  *
+A  4 -1 -2 -2  0 -1 -1  0 -2 -1 -1 -1 -1 -2 -1  1  0 -3 -2  0 -2 -1  0 -4
+R -1  5  0 -2 -3  1  0 -2  0 -3 -2  2 -1 -3 -2 -1 -1 -3 -2 -3 -1  0 -1 -4
+N -2  0  6  1 -3  0  0  0  1 -3 -3  0 -2 -3 -2  1  0 -4 -2 -3  3  0 -1 -4
+D -2 -2  1  6 -3  0  2 -1 -1 -3 -4 -1 -3 -3 -1  0 -1 -4 -3 -3  4  1 -1 -4
+C  0 -3 -3 -3  9 -3 -4 -3 -3 -1 -1 -3 -1 -2 -3 -1 -1 -2 -2 -1 -3 -3 -2 -4
+Q -1  1  0  0 -3  5  2 -2  0 -3 -2  1  0 -3 -1  0 -1 -2 -1 -2  0  3 -1 -4
+E -1  0  0  2 -4  2  5 -2  0 -3 -3  1 -2 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+G  0 -2  0 -1 -3 -2 -2  6 -2 -4 -4 -2 -3 -3 -2  0 -2 -2 -3 -3 -1 -2 -1 -4
+H -2  0  1 -1 -3  0  0 -2  8 -3 -3 -1 -2 -1 -2 -1 -2 -2  2 -3  0  0 -1 -4
+I -1 -3 -3 -3 -1 -3 -3 -4 -3  4  2 -3  1  0 -3 -2 -1 -3 -1  3 -3 -3 -1 -4
+L -1 -2 -3 -4 -1 -2 -3 -4 -3  2  4 -2  2  0 -3 -2 -1 -2 -1  1 -4 -3 -1 -4
+K -1  2  0 -1 -3  1  1 -2 -1 -3 -2  5 -1 -3 -1  0 -1 -3 -2 -2  0  1 -1 -4
+M -1 -1 -2 -3 -1  0 -2 -3 -2  1  2 -1  5  0 -2 -1 -1 -1 -1  1 -3 -1 -1 -4
+F -2 -3 -3 -3 -2 -3 -3 -3 -1  0  0 -3  0  6 -4 -2 -2  1  3 -1 -3 -3 -1 -4
+P -1 -2 -2 -1 -3 -1 -1 -2 -2 -3 -3 -1 -2 -4  7 -1 -1 -4 -3 -2 -2 -1 -2 -4
+S  1 -1  1  0 -1  0  0  0 -1 -2 -2  0 -1 -2 -1  4  1 -3 -2 -2  0  0  0 -4
+T  0 -1  0 -1 -1 -1 -1 -2 -2 -1 -1 -1 -1 -2 -1  1  5 -2 -2  0 -1 -1  0 -4
+W -3 -3 -4 -4 -2 -2 -3 -2 -2 -3 -2 -3 -1  1 -4 -3 -2 11  2 -3 -4 -3 -2 -4
+Y -2 -2 -2 -3 -2 -1 -2 -3  2 -1 -1 -2 -1  3 -3 -2 -2  2  7 -1 -3 -2 -1 -4
+V  0 -3 -3 -3 -1 -2 -2 -3 -3  3  1 -2  1 -1 -2 -2  0 -3 -1  4 -3 -2 -1 -4
+B -2 -1  3  4 -3  0  1 -1  0 -3 -4  0 -3 -3 -2  0 -1 -4 -3 -3  4  1 -1 -4
+Z -1  0  0  1 -3  3  4 -2  0 -3 -3  1 -1 -3 -1  0 -1 -3 -2 -2  1  4 -1 -4
+X  0 -1 -1 -1 -2 -1 -1 -1 -1 -1 -1 -1 -1 -1 -2  0  0 -2 -1 -1 -1 -1 -1 -4
+* -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4 -4  1
+"""
+
+PAM250 = """
+   A  R  N  D  C  Q  E  G  H  I  L  K  M  F  P  S  T  W  Y  V  B  Z  X  *
+A  2 -2  0  0 -2  0  0  1 -1 -1 -2 -1 -1 -3  1  1  1 -6 -3  0  0  0  0 -8
+R -2  6  0 -1 -4  1 -1 -3  2 -2 -3  3  0 -4  0  0 -1  2 -4 -2 -1  0 -1 -8
+N  0  0  2  2 -4  1  1  0  2 -2 -3  1 -2 -3  0  1  0 -4 -2 -2  2  1  0 -8
+D  0 -1  2  4 -5  2  3  1  1 -2 -4  0 -3 -6 -1  0  0 -7 -4 -2  3  3 -1 -8
+C -2 -4 -4 -5 12 -5 -5 -3 -3 -2 -6 -5 -5 -4 -3  0 -2 -8  0 -2 -4 -5 -3 -8
+Q  0  1  1  2 -5  4  2 -1  3 -2 -2  1 -1 -5  0 -1 -1 -5 -4 -2  1  3 -1 -8
+E  0 -1  1  3 -5  2  4  0  1 -2 -3  0 -2 -5 -1  0  0 -7 -4 -2  3  3 -1 -8
+G  1 -3  0  1 -3 -1  0  5 -2 -3 -4 -2 -3 -5  0  1  0 -7 -5 -1  0  0 -1 -8
+H -1  2  2  1 -3  3  1 -2  6 -2 -2  0 -2 -2  0 -1 -1 -3  0 -2  1  2 -1 -8
+I -1 -2 -2 -2 -2 -2 -2 -3 -2  5  2 -2  2  1 -2 -1  0 -5 -1  4 -2 -2 -1 -8
+L -2 -3 -3 -4 -6 -2 -3 -4 -2  2  6 -3  4  2 -3 -3 -2 -2 -1  2 -3 -3 -1 -8
+K -1  3  1  0 -5  1  0 -2  0 -2 -3  5  0 -5 -1  0  0 -3 -4 -2  1  0 -1 -8
+M -1  0 -2 -3 -5 -1 -2 -3 -2  2  4  0  6  0 -2 -2 -1 -4 -2  2 -2 -2 -1 -8
+F -3 -4 -3 -6 -4 -5 -5 -5 -2  1  2 -5  0  9 -5 -3 -3  0  7 -1 -4 -5 -2 -8
+P  1  0  0 -1 -3  0 -1  0  0 -2 -3 -1 -2 -5  6  1  0 -6 -5 -1 -1  0 -1 -8
+S  1  0  1  0  0 -1  0  1 -1 -1 -3  0 -2 -3  1  2  1 -2 -3 -1  0  0  0 -8
+T  1 -1  0  0 -2 -1  0  0 -1  0 -2  0 -1 -3  0  1  3 -5 -3  0  0 -1  0 -8
+W -6  2 -4 -7 -8 -5 -7 -7 -3 -5 -2 -3 -4  0 -6 -2 -5 17  0 -6 -5 -6 -4 -8
+Y -3 -4 -2 -4  0 -4 -4 -5  0 -1 -1 -4 -2  7 -5 -3 -3  0 10 -2 -3 -4 -2 -8
+V  0 -2 -2 -2 -2 -2 -2 -1 -2  4  2 -2  2 -1 -1 -1  0 -6 -2  4 -2 -2 -1 -8
+B  0 -1  2  3 -4  1  3  0  1 -2 -3  1 -2 -4 -1  0  0 -5 -3 -2  3  2 -1 -8
+Z  0  0  1  3 -5  3  3  0  2 -2 -3  0 -2 -5  0  0 -1 -6 -4 -2  2  3 -1 -8
+X  0 -1  0 -1 -3 -1 -1 -1 -1 -1 -1 -1 -1 -2 -1  0  0 -4 -2 -1 -1 -1 -1 -8
+* -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8 -8  1
+"""
+
+MATRICES = {"BLOSUM62": BLOSUM62, "PAM250": PAM250}
+
+# Code of bytes outside the alphabet in SubstitutionMatrix.translation
+INVALID = 255
+
+
+class SubstitutionMatrix:
+    def __init__(self, alphabet, table):
+        self.alphabet = alphabet
+        self.index = dict([(symbol, i) for i, symbol in enumerate(alphabet)])
+        self.table = table
+
+        # byte -> code, for bytes.translate; byte values also score directly
+        self.translation = bytearray([INVALID]) * 256
+        for i, symbol in enumerate(alphabet):
+            if ord(symbol) < INVALID:
+                self.translation[ord(symbol)] = i
+                self.index[ord(symbol)] = i
+
+    def __str__(self):
+        return f"{self.alphabet}"
+
+    def score(self, x, y):
+        return self.table[self.index[x]][self.index[y]]
+
+    """Maps every symbol of the sequence to its row/column in the table,
+    bytes-like sequences at once to bytes of codes"""
+
+    def encode(self, sequence):
+        if isinstance(sequence, (bytes, bytearray, memoryview)):
+            codes = bytes(sequence).translate(self.translation)
+            if INVALID in codes:
+                symbol = chr(bytes(sequence)[codes.index(INVALID)])
+                raise ValueError(f"Invalid Symbol: {symbol}")
+            return codes
+
+        codes = []
+        for symbol in sequence:
+            if symbol not in self.index:
+                raise ValueError(f"Invalid Symbol: {symbol}")
+            codes.append(self.index[symbol])
+        return codes
+
+
+"""Parses a matrix in the NCBI/EMBOSS text format: a header line with the
+alphabet followed by one row per symbol, lines starting with # are comments"""
+
+
+def parse_matrix(text):
+    lines = [
+        line.split() for line in text.splitlines() if line.strip() and line[0] != "#"
+    ]
+    alphabet = lines[0]
+    table = [[0 for _ in alphabet] for _ in alphabet]
+    for row in lines[1:]:
+        symbol = row[0]
+        if symbol not in alphabet or len(row) != len(alphabet) + 1:
+            raise ValueError(f"Invalid matrix row: {' '.join(row)}")
+        i = alphabet.index(symbol)
+        table[i] = [int(score) for score in row[1:]]
+
+    return SubstitutionMatrix(alphabet, table)
+
+
+def load_matrix(name):
+    if isinstance(name, SubstitutionMatrix):
+        return name
+    if name.upper() in MATRICES:
+        return parse_matrix(MATRICES[name.upper()])
+    if os.path.exists(name):
+        with open(name) as matrix_file:
+            return parse_matrix(matrix_file.read())
+    raise ValueError(f"Unknown substitution matrix: {name}")
+
+
+class TestScoringMatrices(unittest.TestCase):
+    def test_blosum62(self):
+        blosum62 = load_matrix("BLOSUM62")
+        self.assertEqual(4, blosum62.score("A", "A"))
+        self.assertEqual(11, blosum62.score("W", "W"))
+        self.assertEqual(-3, blosum62.score("W", "A"))
+        self.assertEqual(blosum62.score("D", "N"), blosum62.score("N", "D"))
+
+    def test_pam250(self):
+        pam250 = load_matrix("pam250")
+        self.assertEqual(17, pam250.score("W", "W"))
+        self.assertEqual(-8, pam250.score("*", "A"))
+
+    def test_encode(self):
+        blosum62 = load_matrix("BLOSUM62")
+        self.assertEqual([0, 1, 2], blosum62.encode("ARN"))
+        self.assertEqual(bytes([0, 1, 2]), blosum62.encode(b"ARN"))
+        self.assertEqual(blosum62.score("W", "W"), blosum62.score(ord("W"), ord("W")))
+        with self.assertRaisesRegex(ValueError, "Invalid Symbol: J"):
+            blosum62.encode(bytearray(b"AJ"))
+        with self.assertRaises(ValueError):
+            blosum62.encode("AJ")
+
+    def test_parse_matrix(self):
+        matrix = parse_matrix("# DNA\n   A  C\nA  1 -1\nC -1  1\n")
+        self.assertEqual(["A", "C"], matrix.alphabet)
+        self.assertEqual([[1, -1], [-1, 1]], matrix.table)
+
+    def test_unknown_matrix(self):
+        with self.assertRaises(ValueError):
+            load_matrix("BLOSUM1000")
+
+
+if __name__ == "__main__":
+    unittest.main()